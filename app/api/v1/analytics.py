@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, get_current_db_user
+from app.core.dates import month_bounds
 from app.models.user import User
 from app.schemas.analytics import (
     PeriodSummary,
@@ -54,23 +55,14 @@ def get_period_dates(
         end = start + timedelta(days=6)
     elif effective_period == "month":
         # Current month
-        start = today.replace(day=1)
-        # End of month
-        if today.month == 12:
-            end = date(today.year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end = date(today.year, today.month + 1, 1) - timedelta(days=1)
+        start, end, _ = month_bounds(today.year, today.month)
     elif effective_period == "year":
         # Current year
         start = date(today.year, 1, 1)
         end = date(today.year, 12, 31)
     else:
         # Default to current month
-        start = today.replace(day=1)
-        if today.month == 12:
-            end = date(today.year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end = date(today.year, today.month + 1, 1) - timedelta(days=1)
+        start, end, _ = month_bounds(today.year, today.month)
 
     return start, end, False
 
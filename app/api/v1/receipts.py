@@ -11,6 +11,7 @@ from app.schemas.receipt import ReceiptUploadResponse, ReceiptResponse, ReceiptL
 from app.services.receipt_processor_v2 import ReceiptProcessorV2
 from app.db.repositories.receipt_repo import ReceiptRepository
 from app.db.repositories.transaction_repo import TransactionRepository
+from app.core.cache import invalidate_user_on_commit
 from app.core.exceptions import ResourceNotFoundError
 from app.services.enriched_profile_service import EnrichedProfileService
 
@@ -91,6 +92,7 @@ async def delete_receipt(
         raise ResourceNotFoundError(f"Receipt {receipt_id} not found")
 
     await receipt_repo.delete(receipt_id)
+    invalidate_user_on_commit(db, current_user.id)
 
     # Rebuild enriched profile after deletion
     await EnrichedProfileService.rebuild_profile(current_user.id, db)
@@ -142,8 +144,10 @@ async def upload_receipt(
         f"items_count={result.items_count}"
     )
 
-    # Rebuild enriched profile with updated transaction data (also invalidates cache)
+    # Drop cached analytics/budgets, and rebuild the enriched profile with the
+    # updated transaction data
     if not result.is_duplicate:
+        invalidate_user_on_commit(db, current_user.id)
         await EnrichedProfileService.rebuild_profile(current_user.id, db)
 
     return result
@@ -15,6 +15,7 @@ from app.schemas.transaction import (
     TransactionBulkDeleteResponse,
 )
 from app.db.repositories.transaction_repo import TransactionRepository
+from app.core.cache import invalidate_user_on_commit
 from app.core.exceptions import ResourceNotFoundError
 
 router = APIRouter()
@@ -114,6 +115,7 @@ async def update_transaction(
         category=update_data.category,
         date=update_data.date,
     )
+    invalidate_user_on_commit(db, current_user.id)
 
     return TransactionResponse.model_validate(updated)
 
@@ -144,6 +146,7 @@ async def delete_transactions_bulk(
             f"No transactions found for {request.store_name} "
             f"between {request.start_date} and {request.end_date}"
         )
+    invalidate_user_on_commit(db, current_user.id)
 
     return TransactionBulkDeleteResponse(
         success=True,
@@ -172,5 +175,6 @@ async def delete_transaction(
         raise ResourceNotFoundError(f"Transaction {transaction_id} not found")
 
     await transaction_repo.delete(transaction_id)
+    invalidate_user_on_commit(db, current_user.id)
 
     return {"message": "Transaction deleted successfully"}
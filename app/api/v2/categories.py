@@ -2,10 +2,9 @@ from fastapi import APIRouter, Depends, Query
 from typing import Optional
 from sqlalchemy import select, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import date
-import calendar
 
 from app.api.deps import get_db, get_current_db_user
+from app.core.dates import month_bounds
 from app.models.user import User
 from app.models.transaction import Transaction
 from app.services.category_registry import get_category_registry
@@ -40,8 +39,7 @@ async def get_used_categories(
     conditions = [Transaction.user_id == current_user.id]
 
     if month and year:
-        first_day = date(year, month, 1)
-        last_day = date(year, month, calendar.monthrange(year, month)[1])
+        first_day, last_day, _ = month_bounds(year, month)
         conditions.append(Transaction.date >= first_day)
         conditions.append(Transaction.date <= last_day)
 
@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, get_current_db_user
+from app.core.cache import invalidate_user, invalidate_user_on_commit
 from app.models.user import User
 from app.schemas.expense_split import (
     ExpenseSplitCreate,
@@ -35,6 +36,8 @@ async def create_expense_split(
         data=data,
     )
     # Commit handled in service for proper relationship refresh
+    # Splits change the user's share of spend, so drop cached analytics
+    invalidate_user_on_commit(db, current_user.id)
     return result
 
 
@@ -113,6 +116,7 @@ async def update_expense_split(
         data=data,
     )
     # Commit handled in service for proper relationship refresh
+    invalidate_user_on_commit(db, current_user.id)
     return result
 
 
@@ -129,6 +133,7 @@ async def delete_expense_split(
         split_id=split_id,
     )
     await db.commit()
+    invalidate_user(current_user.id)
     return {"message": "Split deleted successfully"}
 
 
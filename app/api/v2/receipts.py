@@ -5,7 +5,7 @@ from datetime import date
 from math import ceil
 from typing import Optional
 
-from fastapi import APIRouter, Depends, UploadFile, File, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, get_current_db_user
@@ -25,12 +25,14 @@ from app.db.repositories.receipt_repo import ReceiptRepository
 from app.db.repositories.transaction_repo import TransactionRepository
 from app.core.exceptions import ResourceNotFoundError
 from app.services.enriched_profile_service import EnrichedProfileService
+from app.core.cache import invalidate_user_on_commit
 
 router = APIRouter()
 
 
 @router.post("/upload", response_model=ReceiptUploadResponse)
 async def upload_receipt(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     receipt_date: Optional[date] = Query(None, description="Override receipt date"),
     db: AsyncSession = Depends(get_db),
@@ -90,9 +92,14 @@ async def upload_receipt(
         )
 
     if not result.is_duplicate:
-        t0 = time.monotonic()
-        await EnrichedProfileService.rebuild_profile(current_user.id, db)
-        logger.info(f"⏱ rebuild_enriched_profile: {time.monotonic() - t0:.3f}s")
+        # The profile rebuild doesn't feed the response; run it after the
+        # response is sent. Drop cached analytics now (and again once the
+        # request session commits) so follow-up requests see the new receipt
+        # without waiting for the rebuild.
+        invalidate_user_on_commit(db, current_user.id)
+        background_tasks.add_task(
+            EnrichedProfileService.rebuild_profile_in_background, current_user.id
+        )
 
     logger.info(f"⏱ UPLOAD_TOTAL: {time.monotonic() - t_total:.3f}s")
     return result
@@ -272,6 +279,7 @@ async def delete_receipt(
         raise ResourceNotFoundError(f"Receipt {receipt_id} not found")
 
     await receipt_repo.delete(receipt_id)
+    invalidate_user_on_commit(db, current_user.id)
 
     # Rebuild enriched profile after deletion
     await EnrichedProfileService.rebuild_profile(current_user.id, db)
@@ -327,6 +335,7 @@ async def delete_line_item(
     if len(all_transactions) <= 1:
         # Delete the entire receipt (cascade will delete the transaction)
         await receipt_repo.delete(receipt_id)
+        invalidate_user_on_commit(db, current_user.id)
 
         # Rebuild enriched profile after deletion
         await EnrichedProfileService.rebuild_profile(current_user.id, db)
@@ -342,6 +351,7 @@ async def delete_line_item(
 
     # Delete the transaction
     await transaction_repo.delete(item_id)
+    invalidate_user_on_commit(db, current_user.id)
 
     # Calculate new totals (excluding the deleted item)
     remaining_transactions = [t for t in all_transactions if t.id != item_id]
@@ -14,6 +14,13 @@ class Settings(BaseSettings):
     DATABASE_POOL_SIZE: int = 5
     DATABASE_MAX_OVERFLOW: int = 10
 
+    # Analytics cache
+    # TTL for cached results of completed months/years/date ranges. Invalidation
+    # is in-process only, so with several workers or instances this bounds how
+    # long another process can serve totals from before a backdated edit. Only
+    # raise it once invalidation is shared across processes.
+    PAST_PERIOD_CACHE_TTL_SECONDS: int = 900
+
     # Firebase
     FIREBASE_SERVICE_ACCOUNT: Optional[str] = None  # JSON string
     GOOGLE_APPLICATION_CREDENTIALS: Optional[str] = None  # File path
@@ -2,29 +2,80 @@
 In-memory caching module for analytics and budget data.
 
 Uses TTLCache for automatic expiration. Cache is invalidated when user data changes
-(receipt upload, delete, bank sync, etc.) through the invalidate_user() function.
+(receipt upload, delete, bank sync, etc.) through invalidate_user(), or, from
+request handlers, invalidate_user_on_commit() so the entries are dropped again
+once the writing transaction has committed.
+
+Also holds a content-addressed cache for LLM responses (see cached_llm_call),
+keyed by a hash of the model and prompts so identical requests are only
+generated once within their TTL.
 
 Note: This is an in-memory cache that doesn't persist across server restarts
 and doesn't sync across multiple instances. For single-instance deployments
 this provides significant performance benefits with minimal complexity.
 """
 
+import asyncio
+import hashlib
+import json
 import logging
 from datetime import date
 from functools import wraps
-from typing import Callable, Any
+from typing import Awaitable, Callable, Any, Optional
+
+from cachetools import TLRUCache, TTLCache
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
-from cachetools import TTLCache
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
 # Main cache: 10,000 entries max, 5 minute default TTL
 _cache: TTLCache = TTLCache(maxsize=10000, ttl=300)
 
+# Completed months/years/date ranges don't change unless the user edits their data
+# (which calls invalidate_user), so they get their own tier with a configurable
+# TTL. Invalidation doesn't reach other processes, so keep it short (see
+# PAST_PERIOD_CACHE_TTL_SECONDS) until it does.
+_past_period_cache: TTLCache = TTLCache(
+    maxsize=10000, ttl=get_settings().PAST_PERIOD_CACHE_TTL_SECONDS
+)
+
+# Session.info key holding the user ids to invalidate once the session commits
+_INVALIDATE_ON_COMMIT = "cache_invalidate_user_ids"
+
+# Per-user invalidation counter. A computation that straddles an invalidation
+# (e.g. a whole-year summary running while a receipt commits) must not store
+# its result, or the stale value would outlive the invalidation.
+_user_generations: dict[str, int] = {}
+
 # Track cache statistics for monitoring
 _cache_stats = {"hits": 0, "misses": 0}
 
 
+def _llm_ttu(_key: str, value: tuple[str, float], now: float) -> float:
+    """Per-entry expiry for the LLM cache: entries are stored as (text, ttl)."""
+    return now + value[1]
+
+
+# LLM response cache: 1,000 entries max, TTL chosen per call site
+_llm_cache: TLRUCache = TLRUCache(maxsize=1000, ttu=_llm_ttu)
+_llm_cache_stats = {"hits": 0, "misses": 0}
+
+# In-flight LLM requests by cache key, so concurrent identical requests share
+# a single generation instead of each paying for one
+_llm_inflight: dict[str, asyncio.Future] = {}
+
+
+class _LeaderCancelled(Exception):
+    """Set on a shared in-flight future when the caller running it was cancelled.
+
+    Joiners weren't cancelled themselves, so instead of propagating
+    CancelledError to them they retry the call.
+    """
+
+
 def _build_cache_key(
     func_name: str,
     user_id: str,
@@ -47,13 +98,40 @@ def _build_cache_key(
     return f"{func_name}:{user_id}:{param_str}"
 
 
-def cached(include_month: bool = False):
+def _is_past_period(month: Any, year: Any, end_date: Any = None) -> bool:
+    """Check whether (month, year) is a completed calendar month, or, when
+    month is None, whether year is a completed calendar year. For date-range
+    functions, checks whether end_date is before today."""
+    if isinstance(end_date, date):
+        return end_date < date.today()
+    if not isinstance(year, int):
+        return False
+    today = date.today()
+    if month is None:
+        return year < today.year
+    if not isinstance(month, int):
+        return False
+    return (year, month) < (today.year, today.month)
+
+
+def cached(
+    include_month: bool = False,
+    immutable_past: bool = False,
+    key_exclude: tuple[str, ...] = (),
+):
     """Decorator to cache async function results.
 
     Args:
         include_month: If True, cache key includes current month.
                       Use for functions that return "current month" data
                       to auto-invalidate at month boundaries.
+        immutable_past: If True, results for a completed month, year or date
+                      range (taken from the function's month/year or end_date
+                      arguments; all_time calls never qualify) go into the
+                      long-lived past-period cache instead of the 5 minute one.
+        key_exclude: Argument names left out of the cache key, for arguments
+                      that don't change the result within the key's period
+                      (e.g. a caller-supplied today with include_month).
 
     Usage:
         @cached()
@@ -85,13 +163,14 @@ def cached(include_month: bool = False):
                 return await func(*args, **kwargs)
 
             # Build cache key from all kwargs except 'db' (session objects aren't hashable)
-            cache_params = {k: v for k, v in kwargs.items() if k not in ("db", "user_id")}
+            skip = ("db", "user_id", *key_exclude)
+            cache_params = {k: v for k, v in kwargs.items() if k not in skip}
 
             # Also include relevant positional args (skip self and user_id)
             # This handles cases like get_pie_chart_summary(self, user_id, month, year)
             arg_names = func.__code__.co_varnames[1:]  # Skip 'self'
             for i, (name, value) in enumerate(zip(arg_names, args[1:])):
-                if name not in ("db", "user_id") and name not in cache_params:
+                if name not in skip and name not in cache_params:
                     # Only include hashable values
                     if isinstance(value, (str, int, float, bool, type(None), date)):
                         cache_params[name] = value
@@ -103,20 +182,34 @@ def cached(include_month: bool = False):
                 **cache_params,
             )
 
+            store = _cache
+            if (
+                immutable_past
+                and not cache_params.get("all_time")
+                and _is_past_period(
+                    cache_params.get("month"),
+                    cache_params.get("year"),
+                    cache_params.get("end_date"),
+                )
+            ):
+                store = _past_period_cache
+
             # Check cache
-            if cache_key in _cache:
+            if cache_key in store:
                 _cache_stats["hits"] += 1
                 logger.debug(f"Cache HIT: {cache_key}")
-                return _cache[cache_key]
+                return store[cache_key]
 
             # Cache miss - execute function
             _cache_stats["misses"] += 1
             logger.debug(f"Cache MISS: {cache_key}")
 
+            generation = _user_generations.get(user_id, 0)
             result = await func(*args, **kwargs)
 
-            # Store in cache
-            _cache[cache_key] = result
+            # Store in cache, unless the user's data was invalidated meanwhile
+            if _user_generations.get(user_id, 0) == generation:
+                store[cache_key] = result
 
             return result
 
@@ -124,6 +217,78 @@ def cached(include_month: bool = False):
     return decorator
 
 
+def build_llm_cache_key(model: str, system_prompt: str, user_prompt: str) -> str:
+    """Build a content-addressed cache key for an LLM request."""
+    payload = json.dumps(
+        {"m": model, "sys": system_prompt, "p": user_prompt}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def cached_llm_call(
+    key: str,
+    ttl: float,
+    call: Callable[[], Awaitable[str]],
+    cacheable: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """Return the cached LLM response for key, or run call() and cache it.
+
+    Concurrent misses for the same key are coalesced: the first caller runs
+    call() and the others await its result (or its exception). If the first
+    caller is cancelled, the others retry rather than being cancelled too.
+
+    Args:
+        key: Cache key from build_llm_cache_key()
+        ttl: Seconds to keep the response
+        call: Zero-argument coroutine function performing the LLM request
+        cacheable: Optional check on the response; responses it rejects (e.g.
+                   truncated JSON) are still returned but not cached, so the
+                   next request generates a fresh one
+    """
+    entry = _llm_cache.get(key)
+    if entry is not None:
+        _llm_cache_stats["hits"] += 1
+        logger.debug(f"LLM cache HIT: {key[:12]}")
+        return entry[0]
+
+    inflight = _llm_inflight.get(key)
+    if inflight is not None:
+        _llm_cache_stats["hits"] += 1
+        logger.debug(f"LLM cache JOIN: {key[:12]}")
+        try:
+            return await asyncio.shield(inflight)
+        except _LeaderCancelled:
+            # The leader went away (e.g. client disconnect); run the call
+            # ourselves, or join whichever joiner got there first
+            return await cached_llm_call(key, ttl, call, cacheable)
+
+    _llm_cache_stats["misses"] += 1
+    logger.debug(f"LLM cache MISS: {key[:12]}")
+
+    future = asyncio.get_running_loop().create_future()
+    _llm_inflight[key] = future
+    try:
+        result = await call()
+    except asyncio.CancelledError:
+        # Don't cancel the shared future: that would abort joiners that were
+        # never cancelled. Tell them to retry instead.
+        future.set_exception(_LeaderCancelled())
+        future.exception()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Retrieve it so an exception nobody joined isn't logged as unhandled
+        future.exception()
+        raise
+    else:
+        if result and (cacheable is None or cacheable(result)):
+            _llm_cache[key] = (result, ttl)
+        future.set_result(result)
+        return result
+    finally:
+        del _llm_inflight[key]
+
+
 def invalidate_user(user_id: str) -> int:
     """Invalidate all cached data for a specific user.
 
@@ -140,15 +305,41 @@ def invalidate_user(user_id: str) -> int:
     Returns:
         Number of cache entries invalidated
     """
-    keys_to_delete = [k for k in list(_cache.keys()) if f":{user_id}:" in k]
+    _user_generations[user_id] = _user_generations.get(user_id, 0) + 1
+
+    count = 0
+    for store in (_cache, _past_period_cache):
+        keys_to_delete = [k for k in list(store.keys()) if f":{user_id}:" in k]
+        for key in keys_to_delete:
+            del store[key]
+        count += len(keys_to_delete)
 
-    for key in keys_to_delete:
-        del _cache[key]
+    if count:
+        logger.info(f"Cache invalidated for user {user_id}: {count} entries cleared")
+
+    return count
+
+
+def invalidate_user_on_commit(session: Any, user_id: str) -> None:
+    """Invalidate a user's cached data now and again after session commits.
+
+    Use this from code that writes the user's data inside a transaction (the
+    request session from get_db commits after the handler returns). Dropping
+    the entries only before the commit leaves a window where a concurrent read
+    refills the cache from the pre-commit data.
+
+    Args:
+        session: The AsyncSession (or Session) the changes are written on
+        user_id: The user whose cache should be invalidated
+    """
+    invalidate_user(user_id)
+    session.info.setdefault(_INVALIDATE_ON_COMMIT, set()).add(user_id)
 
-    if keys_to_delete:
-        logger.info(f"Cache invalidated for user {user_id}: {len(keys_to_delete)} entries cleared")
 
-    return len(keys_to_delete)
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    for user_id in session.info.pop(_INVALIDATE_ON_COMMIT, ()):
+        invalidate_user(user_id)
 
 
 def get_cache_stats() -> dict:
@@ -167,6 +358,10 @@ def get_cache_stats() -> dict:
         "current_size": len(_cache),
         "max_size": _cache.maxsize,
         "ttl_seconds": _cache.ttl,
+        "past_period_size": len(_past_period_cache),
+        "llm_hits": _llm_cache_stats["hits"],
+        "llm_misses": _llm_cache_stats["misses"],
+        "llm_current_size": len(_llm_cache),
     }
 
 
@@ -176,7 +371,9 @@ def clear_all() -> int:
     Returns:
         Number of entries cleared
     """
-    count = len(_cache)
+    count = len(_cache) + len(_past_period_cache) + len(_llm_cache)
     _cache.clear()
+    _past_period_cache.clear()
+    _llm_cache.clear()
     logger.info(f"Cache cleared: {count} entries removed")
     return count
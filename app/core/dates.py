@@ -0,0 +1,19 @@
+"""
+Calendar helpers shared by analytics and budget calculations.
+"""
+import calendar
+from datetime import date
+from functools import lru_cache
+
+
+@lru_cache(maxsize=256)
+def month_bounds(year: int, month: int) -> tuple[date, date, int]:
+    """Get (first day, last day, number of days) for a calendar month."""
+    days_in_month = calendar.monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, days_in_month), days_in_month
+
+
+def shift_month(d: date, delta: int) -> date:
+    """Get the first day of the month delta months away from d's month."""
+    m = d.month - 1 + delta
+    return date(d.year + m // 12, m % 12 + 1, 1)
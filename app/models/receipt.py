@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime, date, time
 from typing import TYPE_CHECKING, Optional, List
 
-from sqlalchemy import String, DateTime, Integer, Float, ForeignKey, Text, Enum, Date, Time, func
+from sqlalchemy import String, DateTime, Integer, Float, ForeignKey, Text, Enum, Date, Time, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -67,3 +67,7 @@ class Receipt(Base):
     expense_split: Mapped[Optional["ExpenseSplit"]] = relationship(
         "ExpenseSplit", back_populates="receipt", cascade="all, delete-orphan", uselist=False
     )
+
+    __table_args__ = (
+        Index("ix_receipts_user_date", "user_id", "receipt_date"),
+    )
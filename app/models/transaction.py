@@ -76,7 +76,13 @@ class Transaction(Base):
     )
 
     __table_args__ = (
-        Index("ix_transactions_user_date", "user_id", "date"),
+        # Covers category/item_price so per-user date-range sums can be index-only
+        Index(
+            "ix_transactions_user_date_covering",
+            "user_id",
+            "date",
+            postgresql_include=["category", "item_price"],
+        ),
         Index("ix_transactions_user_store", "user_id", "store_name"),
         Index("ix_transactions_user_category", "user_id", "category"),
     )
@@ -1,3 +1,4 @@
+import heapq
 from datetime import date, timedelta
 from typing import Optional, Dict, List
 from collections import defaultdict
@@ -6,6 +7,7 @@ from sqlalchemy import select, and_, func, case, cast, Date
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.cache import cached
+from app.core.dates import month_bounds, shift_month
 from app.models.transaction import Transaction
 from app.schemas.analytics import (
     PeriodSummary,
@@ -40,13 +42,30 @@ from app.schemas.analytics import (
 from app.services.category_registry import get_category_registry
 from app.services.split_aware_calculation import SplitAwareCalculation
 
+# Columns read by the row-level aggregations (store breakdown, aggregate stats,
+# all-time and year summaries); selecting them as plain rows skips ORM instance
+# hydration and identity-map bookkeeping
+_AGGREGATE_COLUMNS = (
+    Transaction.id,
+    Transaction.receipt_id,
+    Transaction.store_name,
+    Transaction.category,
+    Transaction.item_price,
+    Transaction.quantity,
+    Transaction.health_score,
+    Transaction.date,
+)
+
+# Rows fetched per round trip when streaming transactions through a server-side cursor
+STREAM_BATCH_SIZE = 1000
+
 
 class AnalyticsService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.split_calc = SplitAwareCalculation(db)
 
-    @cached()
+    @cached(immutable_past=True)
     async def get_period_summary(
         self,
         user_id: str,
@@ -66,26 +85,53 @@ class AnalyticsService:
             all_time: If True, query all transactions regardless of date
         """
 
-        # Build query based on whether this is an all-time query
-        if all_time:
-            query = select(Transaction).where(Transaction.user_id == user_id)
-        else:
-            query = select(Transaction).where(
-                and_(
-                    Transaction.user_id == user_id,
-                    Transaction.date >= start_date,
-                    Transaction.date <= end_date,
-                )
+        # Build conditions based on whether this is an all-time query
+        conditions = [Transaction.user_id == user_id]
+        if not all_time:
+            conditions.append(Transaction.date >= start_date)
+            conditions.append(Transaction.date <= end_date)
+
+        # Stream the rows in batches and fold them as they arrive, so heavy
+        # users' transactions are never all held in memory at once
+        result = await self.db.stream(
+            select(
+                Transaction.store_name,
+                Transaction.receipt_id,
+                Transaction.item_price,
+                Transaction.health_score,
+                Transaction.date,
             )
+            .where(*conditions)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
 
-        result = await self.db.execute(query)
-        transactions = list(result.scalars().all())
+        total_spend = 0.0
+        transaction_count = 0
+        health_sum = health_count = 0
+        first_date = last_date = None
+        store_data = defaultdict(lambda: {"amount": 0.0, "receipt_ids": set(), "health_scores": []})
+        async for t in result:
+            transaction_count += 1
+            total_spend += t.item_price
+            if first_date is None or t.date < first_date:
+                first_date = t.date
+            if last_date is None or t.date > last_date:
+                last_date = t.date
+
+            # Group by store (including health scores for per-store average)
+            sd = store_data[t.store_name]
+            sd["amount"] += t.item_price
+            if t.receipt_id:
+                sd["receipt_ids"].add(t.receipt_id)
+            if t.health_score is not None:
+                sd["health_scores"].append(t.health_score)
+                health_sum += t.health_score
+                health_count += 1
 
         # For all-time queries, compute actual date range from transactions
-        if all_time and transactions:
-            dates = [t.date for t in transactions]
-            actual_start = min(dates)
-            actual_end = max(dates)
+        if all_time and transaction_count:
+            actual_start = first_date
+            actual_end = last_date
         elif all_time:
             # No transactions - use today
             actual_start = date.today()
@@ -94,29 +140,17 @@ class AnalyticsService:
             actual_start = start_date
             actual_end = end_date
 
-        if transactions:
-            dates = [t.date for t in transactions]
-            unique_receipt_ids = set(t.receipt_id for t in transactions if t.receipt_id)
-
-        # Get split-adjusted amounts for all transactions
-        tx_amounts = await self.split_calc.get_transaction_user_amounts(user_id, transactions)
-
-        # Calculate totals (split-adjusted)
-        total_spend = sum(amount for _, amount in tx_amounts)
-        transaction_count = len(transactions)
+        # Correct the plain sums for the user's split transactions
+        if transaction_count:
+            adjustment_rows = await self.split_calc.get_split_adjustments(
+                user_id, (Transaction.store_name,), *conditions
+            )
+            for row, adjustment in adjustment_rows:
+                store_data[row.store_name]["amount"] += adjustment
+                total_spend += adjustment
 
         # Calculate average health score (only for items with health scores)
-        health_scores = [t.health_score for t in transactions if t.health_score is not None]
-        average_health_score = round(sum(health_scores) / len(health_scores), 2) if health_scores else None
-
-        # Group by store (including health scores for per-store average)
-        store_data = defaultdict(lambda: {"amount": 0.0, "receipt_ids": set(), "health_scores": []})
-        for t, amount in tx_amounts:
-            store_data[t.store_name]["amount"] += amount
-            if t.receipt_id:
-                store_data[t.store_name]["receipt_ids"].add(t.receipt_id)
-            if t.health_score is not None:
-                store_data[t.store_name]["health_scores"].append(t.health_score)
+        average_health_score = round(health_sum / health_count, 2) if health_count else None
 
         # Build store spending list
         stores = []
@@ -154,7 +188,7 @@ class AnalyticsService:
             average_health_score=average_health_score,
         )
 
-    @cached()
+    @cached(immutable_past=True)
     async def get_pie_chart_summary(
         self,
         user_id: str,
@@ -174,60 +208,81 @@ class AnalyticsService:
         Returns:
             PieChartSummaryResponse with categories containing total_spent and color_hex
         """
-        import calendar
-
         # Calculate date range for the specified month
-        start_date = date(year, month, 1)
-        days_in_month = calendar.monthrange(year, month)[1]
-        end_date = date(year, month, days_in_month)
+        start_date, end_date, _ = month_bounds(year, month)
 
 
-        # Query transactions for the month
-        query = select(Transaction).where(
-            and_(
-                Transaction.user_id == user_id,
-                Transaction.date >= start_date,
-                Transaction.date <= end_date,
+        # Aggregate the month per category and per store in SQL
+        criteria = (
+            Transaction.user_id == user_id,
+            Transaction.date >= start_date,
+            Transaction.date <= end_date,
+        )
+        category_result = await self.db.execute(
+            select(
+                Transaction.category,
+                func.sum(Transaction.item_price).label("amount"),
+                func.count(Transaction.id).label("count"),
+                func.avg(Transaction.health_score).label("avg_health_score"),
             )
+            .where(*criteria)
+            .group_by(Transaction.category)
         )
-        result = await self.db.execute(query)
-        transactions = list(result.scalars().all())
+        store_result = await self.db.execute(
+            select(
+                Transaction.store_name,
+                func.sum(Transaction.item_price).label("amount"),
+                # A visit is a receipt; items without one count as a single visit
+                func.count(func.distinct(func.coalesce(Transaction.receipt_id, ""))).label("visits"),
+                func.avg(Transaction.health_score).label("avg_health_score"),
+            )
+            .where(*criteria)
+            .group_by(Transaction.store_name)
+        )
+        category_rows = category_result.all()
+        store_rows = store_result.all()
+
+        # Correct the plain sums for the user's split transactions
+        category_adjustments: Dict[str, float] = defaultdict(float)
+        store_adjustments: Dict[str, float] = defaultdict(float)
+        if category_rows:
+            adjustment_rows = await self.split_calc.get_split_adjustments(
+                user_id, (Transaction.category, Transaction.store_name), *criteria
+            )
+            for row, adjustment in adjustment_rows:
+                category_adjustments[row.category] += adjustment
+                store_adjustments[row.store_name] += adjustment
 
-        # Get split-adjusted amounts for all transactions
-        tx_amounts = await self.split_calc.get_transaction_user_amounts(user_id, transactions)
+        category_amounts = {
+            row.category: row.amount + category_adjustments.get(row.category, 0.0)
+            for row in category_rows
+        }
 
         # Calculate total spend (split-adjusted)
-        total_spend = sum(amount for _, amount in tx_amounts)
-
-        # Group by category (split-adjusted)
-        category_data = defaultdict(lambda: {"amount": 0.0, "count": 0, "health_scores": []})
-        for t, amount in tx_amounts:
-            category_data[t.category]["amount"] += amount
-            category_data[t.category]["count"] += 1
-            if t.health_score is not None:
-                category_data[t.category]["health_scores"].append(t.health_score)
+        total_spend = sum(category_amounts.values())
 
         # Build category list with color_hex
         registry = get_category_registry()
         categories = []
-        for category_name, data in category_data.items():
-            percentage = (data["amount"] / total_spend * 100) if total_spend > 0 else 0
+        for row in category_rows:
+            amount = category_amounts[row.category]
+            percentage = (amount / total_spend * 100) if total_spend > 0 else 0
             avg_health = (
-                round(sum(data["health_scores"]) / len(data["health_scores"]), 2)
-                if data["health_scores"]
+                round(float(row.avg_health_score), 2)
+                if row.avg_health_score is not None
                 else None
             )
             # Get color from group-based color mapping
-            color_hex = get_category_color(category_name)
+            color_hex = get_category_color(row.category)
 
             categories.append(
                 PieChartCategory(
-                    category_id=registry.get_category_id(category_name),
-                    name=get_category_registry().get_display_name(category_name),
-                    total_spent=round(data["amount"], 2),
+                    category_id=registry.get_category_id(row.category),
+                    name=registry.get_display_name(row.category),
+                    total_spent=round(amount, 2),
                     color_hex=color_hex,
                     percentage=round(percentage, 1),
-                    transaction_count=data["count"],
+                    transaction_count=row.count,
                     average_health_score=avg_health,
                 )
             )
@@ -235,30 +290,23 @@ class AnalyticsService:
         # Sort by total_spent descending
         categories.sort(key=lambda x: x.total_spent, reverse=True)
 
-        # Group by store (split-adjusted)
-        store_data = defaultdict(lambda: {"amount": 0.0, "receipts": set(), "health_scores": []})
-        for t, amount in tx_amounts:
-            store_data[t.store_name]["amount"] += amount
-            store_data[t.store_name]["receipts"].add(t.receipt_id)
-            if t.health_score is not None:
-                store_data[t.store_name]["health_scores"].append(t.health_score)
-
         # Build store list
         stores = []
-        for store_name, data in store_data.items():
-            percentage = (data["amount"] / total_spend * 100) if total_spend > 0 else 0
+        for row in store_rows:
+            amount = row.amount + store_adjustments.get(row.store_name, 0.0)
+            percentage = (amount / total_spend * 100) if total_spend > 0 else 0
             avg_health = (
-                round(sum(data["health_scores"]) / len(data["health_scores"]), 2)
-                if data["health_scores"]
+                round(float(row.avg_health_score), 2)
+                if row.avg_health_score is not None
                 else None
             )
 
             stores.append(
                 PieChartStore(
-                    store_name=store_name,
-                    total_spent=round(data["amount"], 2),
+                    store_name=row.store_name,
+                    total_spent=round(amount, 2),
                     percentage=round(percentage, 1),
-                    visit_count=len(data["receipts"]),
+                    visit_count=row.visits,
                     average_health_score=avg_health,
                 )
             )
@@ -274,7 +322,7 @@ class AnalyticsService:
             stores=stores,
         )
 
-    @cached()
+    @cached(immutable_past=True)
     async def get_category_breakdown(
         self,
         user_id: str,
@@ -305,17 +353,26 @@ class AnalyticsService:
         if store_name:
             conditions.append(Transaction.store_name == store_name)
 
-        # Get all transactions
+        # Aggregate per category in SQL
         result = await self.db.execute(
-            select(Transaction).where(and_(*conditions))
+            select(
+                Transaction.category,
+                func.sum(Transaction.item_price).label("amount"),
+                func.count(Transaction.id).label("count"),
+                func.sum(Transaction.health_score).label("health_sum"),
+                func.count(Transaction.health_score).label("health_count"),
+                func.min(Transaction.date).label("first_date"),
+                func.max(Transaction.date).label("last_date"),
+            )
+            .where(*conditions)
+            .group_by(Transaction.category)
         )
-        transactions = list(result.scalars().all())
+        rows = result.all()
 
         # For all-time queries, compute actual date range from transactions
-        if all_time and transactions:
-            dates = [t.date for t in transactions]
-            actual_start = min(dates)
-            actual_end = max(dates)
+        if all_time and rows:
+            actual_start = min(row.first_date for row in rows)
+            actual_end = max(row.last_date for row in rows)
         elif all_time:
             actual_start = date.today()
             actual_end = date.today()
@@ -323,39 +380,44 @@ class AnalyticsService:
             actual_start = start_date
             actual_end = end_date
 
-        # Get split-adjusted amounts for all transactions
-        tx_amounts = await self.split_calc.get_transaction_user_amounts(user_id, transactions)
+        # Correct the plain sums for the user's split transactions
+        adjustments: Dict[str, float] = defaultdict(float)
+        if rows:
+            adjustment_rows = await self.split_calc.get_split_adjustments(
+                user_id, (Transaction.category,), *conditions
+            )
+            for row, adjustment in adjustment_rows:
+                adjustments[row.category] += adjustment
+
+        category_amounts = {
+            row.category: row.amount + adjustments.get(row.category, 0.0) for row in rows
+        }
 
         # Calculate totals (split-adjusted)
-        total_spend = sum(amount for _, amount in tx_amounts)
+        total_spend = sum(category_amounts.values())
 
         # Calculate overall average health score
-        all_health_scores = [t.health_score for t in transactions if t.health_score is not None]
-        overall_avg_health = round(sum(all_health_scores) / len(all_health_scores), 2) if all_health_scores else None
-
-        # Group by category (split-adjusted)
-        category_data = defaultdict(lambda: {"amount": 0.0, "count": 0, "health_scores": []})
-        for t, amount in tx_amounts:
-            category_data[t.category]["amount"] += amount
-            category_data[t.category]["count"] += 1
-            if t.health_score is not None:
-                category_data[t.category]["health_scores"].append(t.health_score)
+        health_sum = sum(row.health_sum or 0 for row in rows)
+        health_count = sum(row.health_count for row in rows)
+        overall_avg_health = round(health_sum / health_count, 2) if health_count else None
 
         # Build category spending list
+        registry = get_category_registry()
         categories = []
-        for category_name, data in category_data.items():
-            percentage = (data["amount"] / total_spend * 100) if total_spend > 0 else 0
+        for row in rows:
+            amount = category_amounts[row.category]
+            percentage = (amount / total_spend * 100) if total_spend > 0 else 0
             avg_health = (
-                round(sum(data["health_scores"]) / len(data["health_scores"]), 2)
-                if data["health_scores"]
+                round(row.health_sum / row.health_count, 2)
+                if row.health_count
                 else None
             )
             categories.append(
                 CategorySpending(
-                    name=get_category_registry().get_display_name(category_name),
-                    spent=round(data["amount"], 2),
+                    name=registry.get_display_name(row.category),
+                    spent=round(amount, 2),
                     percentage=round(percentage, 1),
-                    transaction_count=data["count"],
+                    transaction_count=row.count,
                     average_health_score=avg_health,
                 )
             )
@@ -375,7 +437,7 @@ class AnalyticsService:
             average_health_score=overall_avg_health,
         )
 
-    @cached()
+    @cached(immutable_past=True)
     async def get_store_breakdown(
         self,
         user_id: str,
@@ -408,9 +470,9 @@ class AnalyticsService:
 
         # Get all transactions for store
         result = await self.db.execute(
-            select(Transaction).where(and_(*conditions))
+            select(*_AGGREGATE_COLUMNS).where(and_(*conditions))
         )
-        transactions = list(result.scalars().all())
+        transactions = result.all()
 
         # For all-time queries, compute actual date range from transactions
         if all_time and transactions:
@@ -443,12 +505,14 @@ class AnalyticsService:
         # Group by category (split-adjusted)
         category_data = defaultdict(lambda: {"amount": 0.0, "count": 0, "health_scores": []})
         for t, amount in tx_amounts:
-            category_data[t.category]["amount"] += amount
-            category_data[t.category]["count"] += 1
+            cd = category_data[t.category]
+            cd["amount"] += amount
+            cd["count"] += 1
             if t.health_score is not None:
-                category_data[t.category]["health_scores"].append(t.health_score)
+                cd["health_scores"].append(t.health_score)
 
         # Build category spending list
+        registry = get_category_registry()
         categories = []
         for category_name, data in category_data.items():
             percentage = (data["amount"] / total_spend * 100) if total_spend > 0 else 0
@@ -459,7 +523,7 @@ class AnalyticsService:
             )
             categories.append(
                 CategorySpending(
-                    name=get_category_registry().get_display_name(category_name),
+                    name=registry.get_display_name(category_name),
                     spent=round(data["amount"], 2),
                     percentage=round(percentage, 1),
                     transaction_count=data["count"],
@@ -474,7 +538,6 @@ class AnalyticsService:
         period_str = "All Time" if all_time else self._format_period(actual_start, actual_end)
 
         # Enrich categories with group info from registry
-        registry = get_category_registry()
         from app.services.category_registry import GROUP_COLORS, GROUP_ICONS
         enriched_categories = []
         for cat in categories:
@@ -529,75 +592,55 @@ class AnalyticsService:
         if period_type == "week":
             earliest_start = today - timedelta(weeks=num_periods)
         elif period_type == "month":
-            month = today.month - num_periods
-            year = today.year
-            while month <= 0:
-                month += 12
-                year -= 1
-            earliest_start = date(year, month, 1)
+            earliest_start = shift_month(today, -num_periods)
         else:  # year
             earliest_start = date(today.year - num_periods, 1, 1)
 
         # Fetch all transactions in the range
-        query = select(Transaction).where(
-            and_(
-                Transaction.user_id == user_id,
-                Transaction.date >= earliest_start,
+        criteria = (
+            Transaction.user_id == user_id,
+            Transaction.date >= earliest_start,
+        )
+        period_col = self._period_start_col(period_type)
+        result = await self.db.execute(
+            select(
+                period_col,
+                func.sum(Transaction.item_price).label("total_spend"),
+                func.count(Transaction.id).label("transaction_count"),
+                func.avg(Transaction.health_score).label("avg_health_score"),
             )
+            .where(*criteria)
+            .group_by(period_col)
         )
-        result = await self.db.execute(query)
-        transactions = list(result.scalars().all())
+        rows = result.all()
 
-        if not transactions:
+        if not rows:
             return TrendsResponse(trends=[], period_type=period_type)
 
-        # Get split-adjusted amounts for all transactions
-        tx_amounts = await self.split_calc.get_transaction_user_amounts(user_id, transactions)
-
-        # Group transactions by period
-        period_data = defaultdict(lambda: {
-            "total_spend": 0.0,
-            "transaction_count": 0,
-            "health_scores": [],
-        })
-
-        for t, amount in tx_amounts:
-            # Determine period start based on period_type
-            if period_type == "week":
-                # Get Monday of the week
-                days_since_monday = t.date.weekday()
-                period_start = t.date - timedelta(days=days_since_monday)
-            elif period_type == "month":
-                period_start = t.date.replace(day=1)
-            else:  # year
-                period_start = date(t.date.year, 1, 1)
-
-            pd = period_data[period_start]
-            pd["total_spend"] += amount
-            pd["transaction_count"] += 1
-            if t.health_score is not None:
-                pd["health_scores"].append(t.health_score)
+        # Correct the plain sums for the user's split transactions
+        adjustments = await self._get_split_adjustments_by_period(
+            user_id, period_type, *criteria
+        )
 
         # Build trends list
         trends = []
-        for period_start_date, data in period_data.items():
-            if data["total_spend"] <= 0:
+        for row in rows:
+            total_spend = round(row.total_spend + adjustments.get(row.period_start, 0.0), 2)
+            if total_spend <= 0:
                 continue
+            period_start_date = row.period_start
 
             # Calculate period end date
             if period_type == "week":
                 period_end_date = period_start_date + timedelta(days=6)
             elif period_type == "month":
-                if period_start_date.month == 12:
-                    period_end_date = date(period_start_date.year + 1, 1, 1) - timedelta(days=1)
-                else:
-                    period_end_date = date(period_start_date.year, period_start_date.month + 1, 1) - timedelta(days=1)
+                period_end_date = month_bounds(period_start_date.year, period_start_date.month)[1]
             else:  # year
                 period_end_date = date(period_start_date.year, 12, 31)
 
             avg_health = (
-                round(sum(data["health_scores"]) / len(data["health_scores"]), 2)
-                if data["health_scores"]
+                round(float(row.avg_health_score), 2)
+                if row.avg_health_score is not None
                 else None
             )
 
@@ -606,8 +649,8 @@ class AnalyticsService:
                     period=self._format_period(period_start_date, period_end_date),
                     start_date=period_start_date,
                     end_date=period_end_date,
-                    total_spend=round(data["total_spend"], 2),
-                    transaction_count=data["transaction_count"],
+                    total_spend=total_spend,
+                    transaction_count=row.transaction_count,
                     average_health_score=avg_health,
                 )
             )
@@ -643,76 +686,56 @@ class AnalyticsService:
         if period_type == "week":
             earliest_start = today - timedelta(weeks=num_periods)
         elif period_type == "month":
-            month = today.month - num_periods
-            year = today.year
-            while month <= 0:
-                month += 12
-                year -= 1
-            earliest_start = date(year, month, 1)
+            earliest_start = shift_month(today, -num_periods)
         else:  # year
             earliest_start = date(today.year - num_periods, 1, 1)
 
         # Fetch all transactions in the range for this store
-        query = select(Transaction).where(
-            and_(
-                Transaction.user_id == user_id,
-                Transaction.store_name == store_name,
-                Transaction.date >= earliest_start,
+        criteria = (
+            Transaction.user_id == user_id,
+            Transaction.store_name == store_name,
+            Transaction.date >= earliest_start,
+        )
+        period_col = self._period_start_col(period_type)
+        result = await self.db.execute(
+            select(
+                period_col,
+                func.sum(Transaction.item_price).label("total_spend"),
+                func.count(Transaction.id).label("transaction_count"),
+                func.avg(Transaction.health_score).label("avg_health_score"),
             )
+            .where(*criteria)
+            .group_by(period_col)
         )
-        result = await self.db.execute(query)
-        transactions = list(result.scalars().all())
+        rows = result.all()
 
-        if not transactions:
+        if not rows:
             return TrendsResponse(trends=[], period_type=period_type)
 
-        # Get split-adjusted amounts for all transactions
-        tx_amounts = await self.split_calc.get_transaction_user_amounts(user_id, transactions)
-
-        # Group transactions by period
-        period_data = defaultdict(lambda: {
-            "total_spend": 0.0,
-            "transaction_count": 0,
-            "health_scores": [],
-        })
-
-        for t, amount in tx_amounts:
-            # Determine period start based on period_type
-            if period_type == "week":
-                # Get Monday of the week
-                days_since_monday = t.date.weekday()
-                period_start = t.date - timedelta(days=days_since_monday)
-            elif period_type == "month":
-                period_start = t.date.replace(day=1)
-            else:  # year
-                period_start = date(t.date.year, 1, 1)
-
-            pd = period_data[period_start]
-            pd["total_spend"] += amount
-            pd["transaction_count"] += 1
-            if t.health_score is not None:
-                pd["health_scores"].append(t.health_score)
+        # Correct the plain sums for the user's split transactions
+        adjustments = await self._get_split_adjustments_by_period(
+            user_id, period_type, *criteria
+        )
 
         # Build trends list
         trends = []
-        for period_start_date, data in period_data.items():
-            if data["total_spend"] <= 0:
+        for row in rows:
+            total_spend = round(row.total_spend + adjustments.get(row.period_start, 0.0), 2)
+            if total_spend <= 0:
                 continue
+            period_start_date = row.period_start
 
             # Calculate period end date
             if period_type == "week":
                 period_end_date = period_start_date + timedelta(days=6)
             elif period_type == "month":
-                if period_start_date.month == 12:
-                    period_end_date = date(period_start_date.year + 1, 1, 1) - timedelta(days=1)
-                else:
-                    period_end_date = date(period_start_date.year, period_start_date.month + 1, 1) - timedelta(days=1)
+                period_end_date = month_bounds(period_start_date.year, period_start_date.month)[1]
             else:  # year
                 period_end_date = date(period_start_date.year, 12, 31)
 
             avg_health = (
-                round(sum(data["health_scores"]) / len(data["health_scores"]), 2)
-                if data["health_scores"]
+                round(float(row.avg_health_score), 2)
+                if row.avg_health_score is not None
                 else None
             )
 
@@ -721,8 +744,8 @@ class AnalyticsService:
                     period=self._format_period(period_start_date, period_end_date),
                     start_date=period_start_date,
                     end_date=period_end_date,
-                    total_spend=round(data["total_spend"], 2),
-                    transaction_count=data["transaction_count"],
+                    total_spend=total_spend,
+                    transaction_count=row.transaction_count,
                     average_health_score=avg_health,
                 )
             )
@@ -758,82 +781,58 @@ class AnalyticsService:
             earliest_start = today - timedelta(weeks=num_periods)
         elif period_type == "month":
             # Go back num_periods months
-            month = today.month - num_periods
-            year = today.year
-            while month <= 0:
-                month += 12
-                year -= 1
-            earliest_start = date(year, month, 1)
+            earliest_start = shift_month(today, -num_periods)
         else:  # year
             earliest_start = date(today.year - num_periods, 1, 1)
 
         # Fetch all transactions in the range
-        query = select(Transaction).where(
-            and_(
-                Transaction.user_id == user_id,
-                Transaction.date >= earliest_start,
+        criteria = (
+            Transaction.user_id == user_id,
+            Transaction.date >= earliest_start,
+        )
+        period_col = self._period_start_col(period_type)
+        result = await self.db.execute(
+            select(
+                period_col,
+                func.sum(Transaction.item_price).label("total_spend"),
+                func.count(func.distinct(Transaction.receipt_id)).label("receipt_count"),
+                func.count(func.distinct(Transaction.store_name)).label("store_count"),
+                func.count(Transaction.id).label("transaction_count"),
+                func.sum(Transaction.quantity).label("total_items"),
+                func.avg(Transaction.health_score).label("avg_health_score"),
             )
+            .where(*criteria)
+            .group_by(period_col)
         )
-        result = await self.db.execute(query)
-        transactions = list(result.scalars().all())
+        rows = result.all()
 
-        if not transactions:
+        if not rows:
             return PeriodsResponse(periods=[], total_periods=0)
 
-        # Get split-adjusted amounts for all transactions
-        tx_amounts = await self.split_calc.get_transaction_user_amounts(user_id, transactions)
-
-        # Group transactions by period
-        period_data = defaultdict(lambda: {
-            "total_spend": 0.0,
-            "receipt_ids": set(),
-            "store_names": set(),
-            "transaction_count": 0,
-            "total_items": 0,
-            "health_scores": [],
-        })
-
-        for t, amount in tx_amounts:
-            # Determine period start based on period_type
-            if period_type == "week":
-                # Get Monday of the week
-                days_since_monday = t.date.weekday()
-                period_start = t.date - timedelta(days=days_since_monday)
-            elif period_type == "month":
-                period_start = t.date.replace(day=1)
-            else:  # year
-                period_start = date(t.date.year, 1, 1)
-
-            pd = period_data[period_start]
-            pd["total_spend"] += amount
-            if t.receipt_id:
-                pd["receipt_ids"].add(t.receipt_id)
-            pd["store_names"].add(t.store_name)
-            pd["transaction_count"] += 1
-            pd["total_items"] += t.quantity
-            if t.health_score is not None:
-                pd["health_scores"].append(t.health_score)
+        # Correct the plain sums for the user's split transactions
+        adjustments = await self._get_split_adjustments_by_period(
+            user_id, period_type, *criteria
+        )
 
         # Build period metadata list
         periods = []
-        for period_start_date, data in period_data.items():
-            if data["total_spend"] <= 0:
+        for row in rows:
+            total_spend = round(row.total_spend + adjustments.get(row.period_start, 0.0), 2)
+            if total_spend <= 0:
                 continue
+            period_start_date = row.period_start
 
             # Calculate period end date
             if period_type == "week":
                 period_end_date = period_start_date + timedelta(days=6)
             elif period_type == "month":
-                if period_start_date.month == 12:
-                    period_end_date = date(period_start_date.year + 1, 1, 1) - timedelta(days=1)
-                else:
-                    period_end_date = date(period_start_date.year, period_start_date.month + 1, 1) - timedelta(days=1)
+                period_end_date = month_bounds(period_start_date.year, period_start_date.month)[1]
             else:  # year
                 period_end_date = date(period_start_date.year, 12, 31)
 
             avg_health = (
-                round(sum(data["health_scores"]) / len(data["health_scores"]), 2)
-                if data["health_scores"]
+                round(float(row.avg_health_score), 2)
+                if row.avg_health_score is not None
                 else None
             )
 
@@ -842,11 +841,11 @@ class AnalyticsService:
                     period=self._format_period(period_start_date, period_end_date),
                     period_start=period_start_date,
                     period_end=period_end_date,
-                    total_spend=round(data["total_spend"], 2),
-                    receipt_count=len(data["receipt_ids"]),
-                    store_count=len(data["store_names"]),
-                    transaction_count=data["transaction_count"],
-                    total_items=data["total_items"],
+                    total_spend=total_spend,
+                    receipt_count=row.receipt_count,
+                    store_count=row.store_count,
+                    transaction_count=row.transaction_count,
+                    total_items=row.total_items or 0,
                     average_health_score=avg_health,
                 )
             )
@@ -860,6 +859,35 @@ class AnalyticsService:
             total_periods=len(periods),
         )
 
+    @staticmethod
+    def _period_start(d: date, period_type: str) -> date:
+        """Start date of the week (Monday), month or year containing d."""
+        if period_type == "week":
+            return d - timedelta(days=d.weekday())
+        elif period_type == "month":
+            return d.replace(day=1)
+        else:  # year
+            return date(d.year, 1, 1)
+
+    @staticmethod
+    def _period_start_col(period_type: str):
+        """SQL expression for the start date of a transaction's week/month/year."""
+        trunc_interval = period_type if period_type in ("week", "month") else "year"
+        return cast(func.date_trunc(trunc_interval, Transaction.date), Date).label("period_start")
+
+    async def _get_split_adjustments_by_period(
+        self,
+        user_id: str,
+        period_type: str,
+        *criteria,
+    ) -> Dict[date, float]:
+        """Sum split adjustments (user share minus full price) per period start."""
+        adjustments: Dict[date, float] = defaultdict(float)
+        rows = await self.split_calc.get_split_adjustments(user_id, (Transaction.date,), *criteria)
+        for row, adjustment in rows:
+            adjustments[self._period_start(row.date, period_type)] += adjustment
+        return adjustments
+
     def _format_period(self, start_date: date, end_date: date) -> str:
         """Format a date range as a period string."""
         if start_date.year == end_date.year:
@@ -890,17 +918,9 @@ class AnalyticsService:
             start = end - timedelta(weeks=num_periods) + timedelta(days=1)
         elif period_type == "month":
             # End at end of current month
-            if today.month == 12:
-                end = date(today.year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end = date(today.year, today.month + 1, 1) - timedelta(days=1)
+            end = month_bounds(today.year, today.month)[1]
             # Go back num_periods months
-            month = today.month - num_periods + 1
-            year = today.year
-            while month <= 0:
-                month += 12
-                year -= 1
-            start = date(year, month, 1)
+            start = shift_month(today, 1 - num_periods)
         else:  # year
             end = date(today.year, 12, 31)
             start = date(today.year - num_periods + 1, 1, 1)
@@ -975,7 +995,7 @@ class AnalyticsService:
             )
 
         # Get all transactions in the range
-        query = select(Transaction).where(
+        query = select(*_AGGREGATE_COLUMNS).where(
             and_(
                 Transaction.user_id == user_id,
                 Transaction.date >= query_start,
@@ -983,7 +1003,7 @@ class AnalyticsService:
             )
         )
         result = await self.db.execute(query)
-        transactions = list(result.scalars().all())
+        transactions = result.all()
 
         if not transactions:
             return AggregateResponse(
@@ -1023,10 +1043,9 @@ class AnalyticsService:
         # Calculate raw total (not split-adjusted) for average item price
         total_raw_spend = sum(t.item_price for t in transactions)
 
-        # Calculate number of actual periods with data for accurate averages
-        periods_with_data = await self._count_periods_with_data(
-            user_id, period_type, query_start, query_end
-        )
+        # Calculate number of actual periods with data for accurate averages;
+        # the transactions are already loaded, so no extra round trip
+        periods_with_data = len({self._period_start(t.date, period_type) for t in transactions})
         actual_num_periods = max(periods_with_data, 1)
 
         totals = AggregateTotals(
@@ -1073,35 +1092,6 @@ class AnalyticsService:
             health_score_distribution=health_distribution,
         )
 
-    async def _count_periods_with_data(
-        self,
-        user_id: str,
-        period_type: str,
-        start_date: date,
-        end_date: date,
-    ) -> int:
-        """Count the number of periods with transaction data."""
-        if period_type == "week":
-            trunc_interval = 'week'
-        elif period_type == "month":
-            trunc_interval = 'month'
-        else:
-            trunc_interval = 'year'
-
-        period_col = func.date_trunc(trunc_interval, Transaction.date)
-        query = (
-            select(func.count(func.distinct(period_col)))
-            .where(
-                and_(
-                    Transaction.user_id == user_id,
-                    Transaction.date >= start_date,
-                    Transaction.date <= end_date,
-                )
-            )
-        )
-        result = await self.db.execute(query)
-        return result.scalar() or 0
-
     async def _get_period_extremes(
         self,
         user_id: str,
@@ -1166,10 +1156,7 @@ class AnalyticsService:
             if p_type == "week":
                 return period_start_date + timedelta(days=6)
             elif p_type == "month":
-                if period_start_date.month == 12:
-                    return date(period_start_date.year + 1, 1, 1) - timedelta(days=1)
-                else:
-                    return date(period_start_date.year, period_start_date.month + 1, 1) - timedelta(days=1)
+                return month_bounds(period_start_date.year, period_start_date.month)[1]
             else:  # year
                 return date(period_start_date.year, 12, 31)
 
@@ -1238,16 +1225,7 @@ class AnalyticsService:
         period_data = defaultdict(lambda: {"total_spend": 0.0, "health_scores": []})
 
         for t, amount in tx_amounts:
-            # Determine period start based on period_type
-            if period_type == "week":
-                days_since_monday = t.date.weekday()
-                period_start = t.date - timedelta(days=days_since_monday)
-            elif period_type == "month":
-                period_start = t.date.replace(day=1)
-            else:  # year
-                period_start = date(t.date.year, 1, 1)
-
-            pd = period_data[period_start]
+            pd = period_data[self._period_start(t.date, period_type)]
             pd["total_spend"] += amount
             if t.health_score is not None:
                 pd["health_scores"].append(t.health_score)
@@ -1286,10 +1264,7 @@ class AnalyticsService:
             if p_type == "week":
                 return period_start_date + timedelta(days=6)
             elif p_type == "month":
-                if period_start_date.month == 12:
-                    return date(period_start_date.year + 1, 1, 1) - timedelta(days=1)
-                else:
-                    return date(period_start_date.year, period_start_date.month + 1, 1) - timedelta(days=1)
+                return month_bounds(period_start_date.year, period_start_date.month)[1]
             else:  # year
                 return date(period_start_date.year, 12, 31)
 
@@ -1352,11 +1327,13 @@ class AnalyticsService:
         category_data = defaultdict(lambda: {"amount": 0.0, "count": 0, "health_scores": []})
 
         for t in transactions:
-            category_data[t.category]["amount"] += t.item_price
-            category_data[t.category]["count"] += 1
+            cd = category_data[t.category]
+            cd["amount"] += t.item_price
+            cd["count"] += 1
             if t.health_score is not None:
-                category_data[t.category]["health_scores"].append(t.health_score)
+                cd["health_scores"].append(t.health_score)
 
+        registry = get_category_registry()
         categories = []
         for category_name, data in category_data.items():
             percentage = (data["amount"] / total_spend * 100) if total_spend > 0 else 0
@@ -1369,7 +1346,7 @@ class AnalyticsService:
             )
             categories.append(
                 CategorySpending(
-                    name=get_category_registry().get_display_name(category_name),
+                    name=registry.get_display_name(category_name),
                     spent=round(data["amount"], 2),
                     percentage=round(percentage, 1),
                     transaction_count=data["count"],
@@ -1377,8 +1354,7 @@ class AnalyticsService:
                 )
             )
 
-        categories.sort(key=lambda x: x.spent, reverse=True)
-        return categories[:limit]
+        return heapq.nlargest(limit, categories, key=lambda x: x.spent)
 
     def _calculate_top_stores(
         self,
@@ -1390,11 +1366,12 @@ class AnalyticsService:
         store_data = defaultdict(lambda: {"amount": 0.0, "receipt_ids": set(), "health_scores": []})
 
         for t in transactions:
-            store_data[t.store_name]["amount"] += t.item_price
+            sd = store_data[t.store_name]
+            sd["amount"] += t.item_price
             if t.receipt_id:
-                store_data[t.store_name]["receipt_ids"].add(t.receipt_id)
+                sd["receipt_ids"].add(t.receipt_id)
             if t.health_score is not None:
-                store_data[t.store_name]["health_scores"].append(t.health_score)
+                sd["health_scores"].append(t.health_score)
 
         stores = []
         for store_name, data in store_data.items():
@@ -1414,8 +1391,7 @@ class AnalyticsService:
                 )
             )
 
-        stores.sort(key=lambda x: x.amount_spent, reverse=True)
-        return stores[:limit]
+        return heapq.nlargest(limit, stores, key=lambda x: x.amount_spent)
 
     async def _calculate_top_categories_split_adjusted(
         self,
@@ -1429,11 +1405,13 @@ class AnalyticsService:
         category_data = defaultdict(lambda: {"amount": 0.0, "count": 0, "health_scores": []})
 
         for t, amount in tx_amounts:
-            category_data[t.category]["amount"] += amount
-            category_data[t.category]["count"] += 1
+            cd = category_data[t.category]
+            cd["amount"] += amount
+            cd["count"] += 1
             if t.health_score is not None:
-                category_data[t.category]["health_scores"].append(t.health_score)
+                cd["health_scores"].append(t.health_score)
 
+        registry = get_category_registry()
         categories = []
         for category_name, data in category_data.items():
             percentage = (data["amount"] / total_spend * 100) if total_spend > 0 else 0
@@ -1446,7 +1424,7 @@ class AnalyticsService:
             )
             categories.append(
                 CategorySpending(
-                    name=get_category_registry().get_display_name(category_name),
+                    name=registry.get_display_name(category_name),
                     spent=round(data["amount"], 2),
                     percentage=round(percentage, 1),
                     transaction_count=data["count"],
@@ -1454,8 +1432,7 @@ class AnalyticsService:
                 )
             )
 
-        categories.sort(key=lambda x: x.spent, reverse=True)
-        return categories[:limit]
+        return heapq.nlargest(limit, categories, key=lambda x: x.spent)
 
     async def _calculate_top_stores_split_adjusted(
         self,
@@ -1468,11 +1445,12 @@ class AnalyticsService:
         store_data = defaultdict(lambda: {"amount": 0.0, "receipt_ids": set(), "health_scores": []})
 
         for t, amount in tx_amounts:
-            store_data[t.store_name]["amount"] += amount
+            sd = store_data[t.store_name]
+            sd["amount"] += amount
             if t.receipt_id:
-                store_data[t.store_name]["receipt_ids"].add(t.receipt_id)
+                sd["receipt_ids"].add(t.receipt_id)
             if t.health_score is not None:
-                store_data[t.store_name]["health_scores"].append(t.health_score)
+                sd["health_scores"].append(t.health_score)
 
         stores = []
         for store_name, data in store_data.items():
@@ -1492,8 +1470,7 @@ class AnalyticsService:
                 )
             )
 
-        stores.sort(key=lambda x: x.amount_spent, reverse=True)
-        return stores[:limit]
+        return heapq.nlargest(limit, stores, key=lambda x: x.amount_spent)
 
     def _calculate_health_distribution(self, transactions: list) -> HealthScoreDistribution:
         """Calculate health score distribution from transactions."""
@@ -1543,10 +1520,10 @@ class AnalyticsService:
         - First and last receipt dates
         """
 
-        # Get all transactions for the user
-        query = select(Transaction).where(Transaction.user_id == user_id)
+        # Get all transactions for the user (only the columns aggregated below)
+        query = select(*_AGGREGATE_COLUMNS).where(Transaction.user_id == user_id)
         result = await self.db.execute(query)
-        transactions = list(result.scalars().all())
+        transactions = result.all()
 
         if not transactions:
             return AllTimeResponse(
@@ -1566,88 +1543,105 @@ class AnalyticsService:
         # Get split-adjusted amounts for all transactions
         tx_amounts = await self.split_calc.get_transaction_user_amounts(user_id, transactions)
 
-        # Calculate totals (split-adjusted)
-        total_spend = sum(amount for _, amount in tx_amounts)
+        # One pass over the transactions for totals, dates, stores and categories;
+        # all-time is the largest set any endpoint walks
+        total_spend = 0.0
+        total_raw_spend = 0.0
+        total_items = 0
+        health_sum = health_count = 0
+        receipt_ids = set()
+        first_receipt_date = last_receipt_date = transactions[0].date
+        store_visits = defaultdict(set)
+        store_spend = defaultdict(float)
+        category_data = defaultdict(lambda: {"amount": 0.0, "count": 0, "health_sum": 0, "health_count": 0})
+        for t, amount in tx_amounts:
+            receipt_id = t.receipt_id
+            store_name = t.store_name
+            health_score = t.health_score
+            tx_date = t.date
+
+            total_spend += amount
+            total_raw_spend += t.item_price
+            total_items += t.quantity
+            if tx_date < first_receipt_date:
+                first_receipt_date = tx_date
+            elif tx_date > last_receipt_date:
+                last_receipt_date = tx_date
+
+            # Visits are not affected by splits
+            if receipt_id:
+                receipt_ids.add(receipt_id)
+                store_visits[store_name].add(receipt_id)
+            store_spend[store_name] += amount
+
+            cd = category_data[t.category]
+            cd["amount"] += amount
+            cd["count"] += 1
+            if health_score is not None:
+                health_sum += health_score
+                health_count += 1
+                cd["health_sum"] += health_score
+                cd["health_count"] += 1
+
         total_transactions = len(transactions)
-        total_items = sum(t.quantity for t in transactions)
-        receipt_ids = set(t.receipt_id for t in transactions if t.receipt_id)
         total_receipts = len(receipt_ids)
 
         # Calculate averages
         # Note: average_item_price uses raw prices (NOT split-adjusted) - it's the actual item cost
-        total_raw_spend = sum(t.item_price for t in transactions)
         average_item_price = round(total_raw_spend / total_items, 2) if total_items > 0 else None
-        health_scores = [t.health_score for t in transactions if t.health_score is not None]
-        average_health_score = round(sum(health_scores) / len(health_scores), 2) if health_scores else None
-
-        # Calculate first and last receipt dates
-        dates = [t.date for t in transactions]
-        first_receipt_date = min(dates)
-        last_receipt_date = max(dates)
-
-        # Calculate top stores by visits (visits not affected by splits)
-        store_visits = defaultdict(set)
-        store_spend = defaultdict(float)
-        for t, amount in tx_amounts:
-            if t.receipt_id:
-                store_visits[t.store_name].add(t.receipt_id)
-            store_spend[t.store_name] += amount
+        average_health_score = round(health_sum / health_count, 2) if health_count else None
 
-        # Top by visits
-        stores_by_visits = [
-            {"store_name": name, "visit_count": len(rids)}
-            for name, rids in store_visits.items()
-        ]
-        stores_by_visits.sort(key=lambda x: x["visit_count"], reverse=True)
+        # Top by visits (nlargest keeps sorted()'s order for ties)
+        stores_by_visits = heapq.nlargest(
+            top_stores_limit,
+            ({"store_name": name, "visit_count": len(rids)} for name, rids in store_visits.items()),
+            key=lambda x: x["visit_count"],
+        )
         top_stores_by_visits = [
             StoreByVisits(
                 store_name=s["store_name"],
                 visit_count=s["visit_count"],
                 rank=i + 1,
             )
-            for i, s in enumerate(stores_by_visits[:top_stores_limit])
+            for i, s in enumerate(stores_by_visits)
         ]
 
         # Top by spend (split-adjusted)
-        stores_by_spend_list = [
-            {"store_name": name, "total_spent": spend}
-            for name, spend in store_spend.items()
-        ]
-        stores_by_spend_list.sort(key=lambda x: x["total_spent"], reverse=True)
+        stores_by_spend_list = heapq.nlargest(
+            top_stores_limit,
+            ({"store_name": name, "total_spent": spend} for name, spend in store_spend.items()),
+            key=lambda x: x["total_spent"],
+        )
         top_stores_by_spend = [
             StoreBySpend(
                 store_name=s["store_name"],
                 total_spent=round(s["total_spent"], 2),
                 rank=i + 1,
             )
-            for i, s in enumerate(stores_by_spend_list[:top_stores_limit])
+            for i, s in enumerate(stores_by_spend_list)
         ]
 
-        # Calculate top categories (split-adjusted)
-        category_data = defaultdict(lambda: {"amount": 0.0, "count": 0, "health_scores": []})
-        for t, amount in tx_amounts:
-            category_data[t.category]["amount"] += amount
-            category_data[t.category]["count"] += 1
-            if t.health_score is not None:
-                category_data[t.category]["health_scores"].append(t.health_score)
-
+        # Top categories (split-adjusted)
+        registry = get_category_registry()
         categories_list = []
         for category_name, data in category_data.items():
             percentage = (data["amount"] / total_spend * 100) if total_spend > 0 else 0
             avg_health = (
-                round(sum(data["health_scores"]) / len(data["health_scores"]), 2)
-                if data["health_scores"]
+                round(data["health_sum"] / data["health_count"], 2)
+                if data["health_count"]
                 else None
             )
             categories_list.append({
-                "name": get_category_registry().get_display_name(category_name),
+                "name": registry.get_display_name(category_name),
                 "total_spent": round(data["amount"], 2),
                 "percentage": round(percentage, 1),
                 "transaction_count": data["count"],
                 "average_health_score": avg_health,
             })
 
-        categories_list.sort(key=lambda x: x["total_spent"], reverse=True)
+        categories_list = heapq.nlargest(
+            top_categories_limit, categories_list, key=lambda x: x["total_spent"]
+        )
         top_categories = [
             TopCategory(
                 name=c["name"],
@@ -1657,7 +1651,7 @@ class AnalyticsService:
                 average_health_score=c["average_health_score"],
                 rank=i + 1,
             )
-            for i, c in enumerate(categories_list[:top_categories_limit])
+            for i, c in enumerate(categories_list)
         ]
 
         return AllTimeResponse(
@@ -1674,7 +1668,7 @@ class AnalyticsService:
             last_receipt_date=last_receipt_date,
         )
 
-    @cached()
+    @cached(immutable_past=True)
     async def get_year_summary(
         self,
         user_id: str,
@@ -1699,8 +1693,8 @@ class AnalyticsService:
         start_date = date(year, 1, 1)
         end_date = date(year, 12, 31)
 
-        # Get all transactions for the year
-        query = select(Transaction).where(
+        # Get all transactions for the year (only the columns aggregated below)
+        query = select(*_AGGREGATE_COLUMNS).where(
             and_(
                 Transaction.user_id == user_id,
                 Transaction.date >= start_date,
@@ -1708,7 +1702,7 @@ class AnalyticsService:
             )
         )
         result = await self.db.execute(query)
-        transactions = list(result.scalars().all())
+        transactions = result.all()
 
         # Return empty response if no transactions
         if not transactions:
@@ -1743,11 +1737,12 @@ class AnalyticsService:
         # Aggregate store data (split-adjusted)
         store_data = defaultdict(lambda: {"amount": 0.0, "receipt_ids": set(), "health_scores": []})
         for t, amount in tx_amounts:
-            store_data[t.store_name]["amount"] += amount
+            sd = store_data[t.store_name]
+            sd["amount"] += amount
             if t.receipt_id:
-                store_data[t.store_name]["receipt_ids"].add(t.receipt_id)
+                sd["receipt_ids"].add(t.receipt_id)
             if t.health_score is not None:
-                store_data[t.store_name]["health_scores"].append(t.health_score)
+                sd["health_scores"].append(t.health_score)
 
         # Build store list sorted by amount_spent descending
         stores = []
@@ -1775,11 +1770,12 @@ class AnalyticsService:
             month_data = defaultdict(lambda: {"amount": 0.0, "receipt_ids": set(), "health_scores": []})
             for t, amount in tx_amounts:
                 month_num = t.date.month
-                month_data[month_num]["amount"] += amount
+                md = month_data[month_num]
+                md["amount"] += amount
                 if t.receipt_id:
-                    month_data[month_num]["receipt_ids"].add(t.receipt_id)
+                    md["receipt_ids"].add(t.receipt_id)
                 if t.health_score is not None:
-                    month_data[month_num]["health_scores"].append(t.health_score)
+                    md["health_scores"].append(t.health_score)
 
             # Build monthly breakdown list, only including months with data
             month_names = [
@@ -1807,11 +1803,13 @@ class AnalyticsService:
         # Calculate top categories (split-adjusted)
         category_data = defaultdict(lambda: {"amount": 0.0, "count": 0, "health_scores": []})
         for t, amount in tx_amounts:
-            category_data[t.category]["amount"] += amount
-            category_data[t.category]["count"] += 1
+            cd = category_data[t.category]
+            cd["amount"] += amount
+            cd["count"] += 1
             if t.health_score is not None:
-                category_data[t.category]["health_scores"].append(t.health_score)
+                cd["health_scores"].append(t.health_score)
 
+        registry = get_category_registry()
         categories = []
         for category_name, data in category_data.items():
             percentage = (data["amount"] / total_spend * 100) if total_spend > 0 else 0
@@ -1822,7 +1820,7 @@ class AnalyticsService:
             )
             categories.append(
                 YearCategorySpending(
-                    name=get_category_registry().get_display_name(category_name),
+                    name=registry.get_display_name(category_name),
                     spent=round(data["amount"], 2),
                     percentage=round(percentage, 1),
                     transaction_count=data["count"],
@@ -1830,9 +1828,8 @@ class AnalyticsService:
                 )
             )
 
-        # Sort by spent descending and limit
-        categories.sort(key=lambda x: x.spent, reverse=True)
-        top_categories = categories[:top_categories_limit]
+        # Top categories by spend (nlargest keeps sorted()'s order for ties)
+        top_categories = heapq.nlargest(top_categories_limit, categories, key=lambda x: x.spent)
 
         return YearSummaryResponse(
             year=year,
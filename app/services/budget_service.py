@@ -1,11 +1,12 @@
-import calendar
 from datetime import date
-from typing import List
+from typing import List, Optional
 
-from sqlalchemy import select, and_
+from pydantic import TypeAdapter
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.cache import cached
+from app.core.dates import month_bounds
 from app.models.transaction import Transaction
 from app.models.budget import Budget
 from app.schemas.budget import (
@@ -17,57 +18,74 @@ from app.schemas.budget import (
 from app.services.split_aware_calculation import SplitAwareCalculation
 from app.services.category_registry import get_category_registry
 
+# Validates a budget's stored allocations in one call instead of one model per row
+_CATEGORY_ALLOCATIONS = TypeAdapter(List[CategoryAllocation])
+
 
 class BudgetService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.split_calc = SplitAwareCalculation(db)
 
-    @cached(include_month=True)
-    async def get_current_month_spend(self, user_id: str) -> float:
-        """Get total spending for the current month (split-adjusted)."""
-        today = date.today()
+    @cached(include_month=True, key_exclude=("today",))
+    async def _get_current_month_spend_bundle(
+        self, user_id: str, today: Optional[date] = None
+    ) -> tuple[float, dict[str, float]]:
+        """Get (total, by-category) spending for the current month (split-adjusted).
+
+        Both come from one per-category SQL aggregate plus the split
+        corrections, so the month's rows are never loaded into Python.
+
+        Callers that already hold today's date can pass it so the month window
+        matches the rest of their response. It is left out of the cache key,
+        so every caller shares the month's entry.
+        """
+        today = today or date.today()
         first_day = today.replace(day=1)
+        conditions = (
+            Transaction.user_id == user_id,
+            Transaction.date >= first_day,
+            Transaction.date <= today,
+        )
 
         result = await self.db.execute(
-            select(Transaction).where(
-                and_(
-                    Transaction.user_id == user_id,
-                    Transaction.date >= first_day,
-                    Transaction.date <= today,
-                )
+            select(
+                Transaction.category,
+                func.sum(Transaction.item_price).label("amount"),
             )
+            .where(*conditions)
+            .group_by(Transaction.category)
+        )
+        rows = result.all()
+
+        if not rows:
+            return 0.0, {}
+
+        category_spend: dict[str, float] = {row.category: row.amount for row in rows}
+
+        # Correct the plain sums for the user's split transactions. Under READ
+        # COMMITTED this statement can still see a row committed after the sum,
+        # so don't assume its category is already present
+        adjustment_rows = await self.split_calc.get_split_adjustments(
+            user_id, (Transaction.category,), *conditions
         )
-        transactions = list(result.scalars().all())
+        for row, adjustment in adjustment_rows:
+            category_spend[row.category] = category_spend.get(row.category, 0.0) + adjustment
 
-        if not transactions:
-            return 0.0
+        total = sum(category_spend.values())
+        return round(total, 2), {cat: round(spend, 2) for cat, spend in category_spend.items()}
 
-        return await self.split_calc.calculate_split_adjusted_spend(user_id, transactions)
+    async def get_current_month_spend(self, user_id: str) -> float:
+        """Get total spending for the current month (split-adjusted)."""
+        total, _ = await self._get_current_month_spend_bundle(user_id)
+        return total
 
-    @cached(include_month=True)
     async def get_current_month_spend_by_category(
         self, user_id: str
     ) -> dict[str, float]:
         """Get spending by category for the current month (split-adjusted)."""
-        today = date.today()
-        first_day = today.replace(day=1)
-
-        result = await self.db.execute(
-            select(Transaction).where(
-                and_(
-                    Transaction.user_id == user_id,
-                    Transaction.date >= first_day,
-                    Transaction.date <= today,
-                )
-            )
-        )
-        transactions = list(result.scalars().all())
-
-        if not transactions:
-            return {}
-
-        return await self.split_calc.calculate_split_adjusted_spend_by_category(user_id, transactions)
+        _, spend_by_category = await self._get_current_month_spend_bundle(user_id)
+        return spend_by_category
 
     async def get_budget_progress(
         self, user_id: str, budget: Budget
@@ -80,19 +98,24 @@ class BudgetService:
         """
         today = date.today()
 
-        current_spend = round(await self.get_current_month_spend(user_id), 2)
-        spend_by_category = await self.get_current_month_spend_by_category(user_id)
+        current_spend, spend_by_category = await self._get_current_month_spend_bundle(
+            user_id, today
+        )
 
         days_elapsed = today.day
-        days_in_month = calendar.monthrange(today.year, today.month)[1]
+        days_in_month = month_bounds(today.year, today.month)[2]
 
         category_progress: List[CategoryProgress] = []
+        category_allocations: Optional[List[CategoryAllocation]] = None
         registry = get_category_registry()
 
         if budget.category_allocations:
-            for alloc in budget.category_allocations:
-                category_name = alloc.get("category", "")
-                limit_amount = round(float(alloc.get("amount", 0)), 2)
+            category_allocations = _CATEGORY_ALLOCATIONS.validate_python(
+                budget.category_allocations
+            )
+            for alloc in category_allocations:
+                category_name = alloc.category
+                limit_amount = round(alloc.amount, 2)
                 spent_amount = round(spend_by_category.get(category_name, 0), 2)
 
                 # Over budget only when spend exceeds limit by at least 1 cent
@@ -122,12 +145,7 @@ class BudgetService:
             id=budget.id,
             user_id=budget.user_id,
             monthly_amount=budget.monthly_amount,
-            category_allocations=[
-                CategoryAllocation(category=alloc.get("category", ""), amount=alloc.get("amount", 0))
-                for alloc in (budget.category_allocations or [])
-            ]
-            if budget.category_allocations
-            else None,
+            category_allocations=category_allocations,
             is_smart_budget=budget.is_smart_budget,
             created_at=budget.created_at,
             updated_at=budget.updated_at,
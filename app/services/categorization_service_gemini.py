@@ -1,16 +1,27 @@
+import asyncio
 import json
+import logging
+import random
 from dataclasses import dataclass
 from typing import List, Optional
 
-from google import genai
+from google.genai import errors as genai_errors
 from google.genai import types
 
 from app.core.exceptions import GeminiAPIError
 from app.services.category_registry import get_category_registry
 from app.config import get_settings
+from app.services.gemini_client import get_gemini_client
 from app.services.veryfi_service import VeryfiLineItem
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Gemini status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 503, 504}
+
+# Reused by _extract_json to pull the first complete object out of prose
+_JSON_DECODER = json.JSONDecoder()
 
 
 @dataclass
@@ -36,6 +47,10 @@ class CategorizationServiceGemini:
 
     MODEL = "gemini-2.0-flash"
     MAX_TOKENS = 4096
+    MAX_ATTEMPTS = 4
+    MAX_BACKOFF_SECONDS = 30
+
+    _USER_PREFIX = "Clean and categorize this receipt data:\n\n"
 
     SYSTEM_PROMPT = """You are a grocery receipt categorization assistant. Given a store name and list of items from a grocery receipt, clean up the data, categorize each item into one of the grocery sub-categories below, assign a health score, and DEDUPLICATE items.
 
@@ -139,7 +154,15 @@ Return ONLY valid JSON with this exact format:
         self.api_key = api_key or settings.GEMINI_API_KEY
         if not self.api_key:
             raise ValueError("Gemini API key not configured")
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = get_gemini_client(self.api_key)
+        # The system prompt and generation settings never change between calls,
+        # so build the request config once and reuse it.
+        self._config = types.GenerateContentConfig(
+            system_instruction=self.SYSTEM_PROMPT,
+            max_output_tokens=self.MAX_TOKENS,
+            temperature=0.1,
+            response_mime_type="application/json",
+        )
 
     async def categorize_items(
         self, items: List[VeryfiLineItem], vendor_name: Optional[str] = None
@@ -165,19 +188,11 @@ Return ONLY valid JSON with this exact format:
             store_line = f"Store name: {vendor_name}\n\n" if vendor_name else "Store name: Unknown\n\n"
             user_content = f"{store_line}Items:\n{items_text}"
 
-            # Call Gemini API
-            response = self.client.models.generate_content(
-                model=self.MODEL,
-                contents=f"Clean and categorize this receipt data:\n\n{user_content}",
-                config=types.GenerateContentConfig(
-                    system_instruction=self.SYSTEM_PROMPT,
-                    max_output_tokens=self.MAX_TOKENS,
-                    temperature=0.1,
-                ),
-            )
+            # Call Gemini API (async streaming so the event loop is never blocked
+            # while the response is being decoded)
+            response_text = await self._generate(self._USER_PREFIX + user_content)
 
             # Parse response
-            response_text = response.text
             json_str = self._extract_json(response_text)
             result_data = json.loads(json_str)
 
@@ -200,6 +215,33 @@ Return ONLY valid JSON with this exact format:
                 details={"error_type": "unexpected", "error": str(e)},
             )
 
+    async def _generate(self, contents: str) -> str:
+        """Stream a Gemini response and return the concatenated text.
+
+        Retries with exponential backoff and jitter on rate-limit and transient
+        server errors; any other error is raised to the caller immediately.
+        """
+        for attempt in range(self.MAX_ATTEMPTS):
+            try:
+                chunks = []
+                async for chunk in await self.client.aio.models.generate_content_stream(
+                    model=self.MODEL,
+                    contents=contents,
+                    config=self._config,
+                ):
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                return "".join(chunks)
+            except genai_errors.APIError as e:
+                if e.code not in RETRYABLE_STATUS_CODES or attempt == self.MAX_ATTEMPTS - 1:
+                    raise
+                wait = min(2 ** attempt, self.MAX_BACKOFF_SECONDS) + random.random()
+                logger.warning(
+                    f"Gemini categorization failed with {e.code} (attempt {attempt + 1}), "
+                    f"retrying in {wait:.1f}s..."
+                )
+                await asyncio.sleep(wait)
+
     def _format_items_for_prompt(self, items: List[VeryfiLineItem]) -> str:
         """Format items as text for the Gemini prompt."""
         lines = []
@@ -209,11 +251,29 @@ Return ONLY valid JSON with this exact format:
         return "\n".join(lines)
 
     def _extract_json(self, text: str) -> str:
-        """Extract JSON from response, handling markdown code blocks."""
+        """Extract JSON from response, handling markdown code blocks.
+
+        JSON mode normally returns a bare object; the fence handling is kept
+        as a fallback for responses that still wrap it.
+        """
+        stripped = text.strip()
+        if stripped.startswith("{"):
+            return stripped
+        # partition stops at the first fence instead of splitting the whole text
         if "```json" in text:
-            text = text.split("```json")[1].split("```")[0]
+            text = text.partition("```json")[2].partition("```")[0]
         elif "```" in text:
-            text = text.split("```")[1].split("```")[0]
+            text = text.partition("```")[2].partition("```")[0]
+        else:
+            # Object wrapped in prose: decode from the first brace up to its
+            # matching close (string/escape aware, single linear pass)
+            start = text.find("{")
+            if start != -1:
+                try:
+                    _, end = _JSON_DECODER.raw_decode(text, start)
+                    return text[start:end]
+                except json.JSONDecodeError:
+                    pass
         return text.strip()
 
     def _build_categorized_items(
@@ -227,6 +287,7 @@ Return ONLY valid JSON with this exact format:
         receipt sections. Uses 'original_indices' to map back to Veryfi data.
         """
         result = []
+        registry = get_category_registry()
 
         for cat_data in categorizations:
             # Get the original indices - supports both new format (original_indices)
@@ -254,13 +315,11 @@ Return ONLY valid JSON with this exact format:
             if primary_item.total is None and primary_item.price is None:
                 continue
 
-            # Parse category with registry validation
-            category_str = cat_data.get("category", "Unknown Transaction")
-            registry = get_category_registry()
-            if not registry.is_valid(category_str):
-                # Try fuzzy matching
-                matched = registry.find_closest_match(category_str)
-                category_str = matched if matched else "Unknown Transaction"
+            # Normalize category against the registry (exact, case-insensitive,
+            # then fuzzy match) in a single lookup
+            category_str = registry.find_closest_match(
+                cat_data.get("category") or "Unknown Transaction"
+            ) or "Unknown Transaction"
 
             # Parse health score
             health_score_raw = cat_data.get("health_score")
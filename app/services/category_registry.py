@@ -11,11 +11,15 @@ internally (since category IS the leaf level).
 """
 import csv
 import os
+import re
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 from functools import lru_cache
 from difflib import SequenceMatcher
 
+# Character rewrites for get_category_id, applied in one str.translate pass
+_CATEGORY_ID_TRANS = str.maketrans({"(": None, ")": None, **{ch: "_" for ch in "&/-,."}})
+
 
 @dataclass
 class SubCategoryInfo:
@@ -96,6 +100,8 @@ class CategoryRegistry:
         self._groups: Dict[str, GroupNode] = {}
         # All sub-category names
         self._all_sub_categories: List[str] = []
+        # sub_category → generated category_id (precomputed by load())
+        self._category_ids: Dict[str, str] = {}
 
     @classmethod
     def get_instance(cls) -> "CategoryRegistry":
@@ -164,6 +170,12 @@ class CategoryRegistry:
                 )
                 self._lower_lookup[old_name.lower()] = old_name
 
+        # Precompute ids for every known name; get_category_id builds ids for
+        # names outside the registry on the fly without storing them
+        self._category_ids = {
+            name: self._build_category_id(name) for name in self._lookup
+        }
+
     def get_group(self, sub_category: str) -> Optional[str]:
         """Get the group name for a sub-category."""
         info = self._lookup.get(sub_category)
@@ -290,14 +302,17 @@ class CategoryRegistry:
         Converts display name to an uppercase snake_case ID.
         e.g., "Meat & Poultry" -> "MEAT_POULTRY"
         """
-        s = self.get_display_name(sub_category).upper()
-        # Remove parentheses content markers but keep the text
-        s = s.replace("(", "").replace(")", "")
-        # Replace special chars with underscores
-        for ch in "&/-,.":
-            s = s.replace(ch, "_")
+        # Registered names are precomputed by load(); unknown ones (from LLM or
+        # user input) are built per call so the map can't grow without bound
+        category_id = self._category_ids.get(sub_category)
+        if category_id is None:
+            category_id = self._build_category_id(sub_category)
+        return category_id
+
+    def _build_category_id(self, sub_category: str) -> str:
+        # Drop parentheses (keeping their text) and turn special chars into underscores
+        s = self.get_display_name(sub_category).upper().translate(_CATEGORY_ID_TRANS)
         # Collapse multiple spaces/underscores
-        import re
         s = re.sub(r"[\s_]+", "_", s)
         # Strip leading/trailing underscores
         s = s.strip("_")
@@ -1,3 +1,4 @@
+import heapq
 import logging
 from collections import Counter, defaultdict
 from datetime import date, timedelta
@@ -6,11 +7,12 @@ from typing import Any
 from sqlalchemy import select, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.cache import invalidate_user
+from app.core.cache import invalidate_user_on_commit
 from app.models.transaction import Transaction
 from app.models.receipt import Receipt
 from app.models.enums import ReceiptStatus
 from app.db.repositories.enriched_profile_repo import EnrichedProfileRepository
+from app.db.session import async_session_maker
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +20,8 @@ logger = logging.getLogger(__name__)
 LOOKBACK_DAYS = 120
 # Max promo interest items
 MAX_INTEREST_ITEMS = 25
+# Day names indexed by date.weekday(); avoids a locale-dependent strftime per row
+_DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
 
 
 class EnrichedProfileService:
@@ -86,9 +90,6 @@ class EnrichedProfileService:
                 receipts_analyzed=receipt_count,
             )
 
-            # Invalidate analytics/budget cache since transaction data has changed
-            invalidate_user(user_id)
-
             logger.info(
                 f"Enriched profile rebuilt for user {user_id}: "
                 f"{receipt_count} receipts, {len(transactions)} transactions, "
@@ -96,6 +97,21 @@ class EnrichedProfileService:
             )
         except Exception:
             logger.exception(f"Failed to rebuild enriched profile for user {user_id}")
+        finally:
+            # Callers rebuild after changing transaction data, so invalidate the
+            # analytics/budget cache even if the rebuild itself failed
+            invalidate_user_on_commit(db, user_id)
+
+    @staticmethod
+    async def rebuild_profile_in_background(user_id: str) -> None:
+        """Rebuild the enriched profile on its own session.
+
+        For use as a response background task: the request session is already
+        closed by the time it runs, so this opens and commits its own.
+        """
+        async with async_session_maker() as session:
+            await EnrichedProfileService.rebuild_profile(user_id, session)
+            await session.commit()
 
 
 def _build_shopping_habits(
@@ -128,18 +144,125 @@ def _build_shopping_habits(
             "payment_insights": None,
         }
 
-    total_spend = sum(t.item_price for t in transactions)
     weeks_in_period = max((date.today() - cutoff).days / 7, 1)
+    today = date.today()
 
-    # Store aggregation
+    # Disposable bag spending — detect carrier bags so the LLM can suggest
+    # bringing a reusable bag instead of searching for bag promotions.
+    BAG_KEYWORDS = {"draagtas", "tas", "zak", "bag", "sachet", "carrier bag"}
+
+    # Fresh produce & ready meals % of food spend
+    FOOD_CATEGORIES = {
+        "Meat & Fish", "Fresh Produce", "Dairy & Eggs",
+        "Ready Meals", "Bakery", "Pantry", "Frozen",
+        "Snacks & Sweets", "Drinks (Soft/Soda)", "Drinks (Water)",
+        "Alcohol", "Baby & Kids",
+    }
+
+    # Single pass over the transactions feeding every aggregation below
+    total_spend = 0
     store_data: dict[str, dict] = defaultdict(lambda: {"spend": 0.0, "visits": set(), "items": 0})
+    cat_data: dict[str, dict] = defaultdict(lambda: {"spend": 0.0, "health_scores": [], "count": 0})
+    health_scores: list[int] = []
+    branded_count = 0
+    premium_count = 0
+    gran_cat_counts: dict[str, int] = defaultdict(int)
+    receipt_groups: dict[str, list[Transaction]] = defaultdict(list)
+    dow_counts: Counter = Counter()
+    bag_total = 0
+    bag_count = 0
+    has_discounts = False
+    total_saved = 0
+    store_savings: dict[str, float] = defaultdict(float)
+    recent_health_sum = recent_health_count = 0
+    prev_health_sum = prev_health_count = 0
+    store_health: dict[str, list[int]] = defaultdict(list)
+    total_food_spend = fresh_produce_spend = ready_meals_spend = 0
+    premium_spend = house_brand_spend = unbranded_spend = 0
+    total_real_spend = alcohol_spend = snacks_sweets_spend = tobacco_spend = 0
+    cat_store_spend: dict[tuple[str, str], float] = defaultdict(float)
+
     for t in transactions:
-        store_data[t.store_name]["spend"] += t.item_price
-        store_data[t.store_name]["visits"].add((t.receipt_id, t.date))
-        store_data[t.store_name]["items"] += 1
+        price = t.item_price
+        total_spend += price
 
-    preferred_stores = sorted(
-        [
+        # Store aggregation
+        store = store_data[t.store_name]
+        store["spend"] += price
+        store["visits"].add((t.receipt_id, t.date))
+        store["items"] += 1
+
+        # Category aggregation
+        cat = cat_data[t.category if t.category else "Other"]
+        cat["spend"] += price
+        cat["count"] += 1
+
+        if t.health_score is not None:
+            cat["health_scores"].append(t.health_score)
+            health_scores.append(t.health_score)
+            store_health[t.store_name].append(t.health_score)
+            days_ago = (today - t.date).days
+            if days_ago <= 28:
+                recent_health_sum += t.health_score
+                recent_health_count += 1
+            elif 29 <= days_ago <= 56:
+                prev_health_sum += t.health_score
+                prev_health_count += 1
+
+        if t.normalized_brand:
+            branded_count += 1
+            if t.is_premium:
+                premium_count += 1
+
+        if t.granular_category and t.granular_category not in ("Discounts", "Other"):
+            gran_cat_counts[t.granular_category] += 1
+
+        if t.receipt_id:
+            receipt_groups[t.receipt_id].append(t)
+
+        dow_counts[_DAY_NAMES[t.date.weekday()]] += 1
+
+        if t.normalized_name:
+            name_lower = t.normalized_name.lower()
+            if any(kw in name_lower for kw in BAG_KEYWORDS):
+                bag_total += price
+                bag_count += 1
+
+        if t.is_discount:
+            has_discounts = True
+            total_saved += price
+            store_savings[t.store_name] += abs(price)
+
+        if not t.is_discount and not t.is_deposit:
+            if t.category in FOOD_CATEGORIES:
+                total_food_spend += price
+                if t.category == "Fresh Produce":
+                    fresh_produce_spend += price
+                elif t.category == "Ready Meals":
+                    ready_meals_spend += price
+
+            total_real_spend += price
+            if t.is_premium:
+                premium_spend += price
+            if not t.normalized_brand:
+                unbranded_spend += price
+            elif not t.is_premium:
+                house_brand_spend += price
+
+            if t.category == "Alcohol":
+                alcohol_spend += price
+            elif t.category == "Snacks & Sweets":
+                snacks_sweets_spend += price
+            elif t.category == "Tobacco":
+                tobacco_spend += price
+
+            if t.category:
+                cat_store_spend[(t.category, t.store_name)] += price
+
+    # Only the top 10 stores are kept in the profile
+    preferred_stores = heapq.nlargest(
+        10,
+        (
             {
                 "name": name,
                 "spend": round(d["spend"], 2),
@@ -147,20 +270,10 @@ def _build_shopping_habits(
                 "visits": len(d["visits"]),
             }
             for name, d in store_data.items()
-        ],
+        ),
         key=lambda s: s["spend"],
-        reverse=True,
     )
 
-    # Category aggregation
-    cat_data: dict[str, dict] = defaultdict(lambda: {"spend": 0.0, "health_scores": [], "count": 0})
-    for t in transactions:
-        cat_val = t.category if t.category else "Other"
-        cat_data[cat_val]["spend"] += t.item_price
-        cat_data[cat_val]["count"] += 1
-        if t.health_score is not None:
-            cat_data[cat_val]["health_scores"].append(t.health_score)
-
     # Filter out "Other" category (contains discounts/deposits) and negative spend
     category_breakdown = sorted(
         [
@@ -181,36 +294,24 @@ def _build_shopping_habits(
     )
 
     # Health score
-    health_scores = [t.health_score for t in transactions if t.health_score is not None]
     avg_health = round(sum(health_scores) / len(health_scores), 1) if health_scores else None
 
     # Premium ratio
-    items_with_brand = [t for t in transactions if t.normalized_brand]
-    premium_count = sum(1 for t in items_with_brand if t.is_premium)
-    premium_ratio = round(premium_count / len(items_with_brand), 2) if items_with_brand else 0
+    premium_ratio = round(premium_count / branded_count, 2) if branded_count else 0
 
     # Granular categories (top 15, excluding "Discounts" and "Other" which are not product categories)
-    gran_cat_counts: dict[str, int] = defaultdict(int)
-    for t in transactions:
-        if t.granular_category and t.granular_category not in ("Discounts", "Other"):
-            gran_cat_counts[t.granular_category] += 1
     top_granular = [
-        cat for cat, _ in sorted(gran_cat_counts.items(), key=lambda x: x[1], reverse=True)[:15]
+        cat for cat, _ in heapq.nlargest(15, gran_cat_counts.items(), key=lambda x: x[1])
     ]
 
     # Basket size
-    receipt_item_counts: dict[str, int] = defaultdict(int)
-    for t in transactions:
-        if t.receipt_id:
-            receipt_item_counts[t.receipt_id] += 1
     typical_basket = (
-        round(sum(receipt_item_counts.values()) / len(receipt_item_counts), 1)
-        if receipt_item_counts
+        round(sum(len(r_txns) for r_txns in receipt_groups.values()) / len(receipt_groups), 1)
+        if receipt_groups
         else 0
     )
 
     # Preferred shopping days (day-of-week distribution, days above 10%)
-    dow_counts = Counter(t.date.strftime("%A") for t in transactions)
     total_dow = sum(dow_counts.values())
     preferred_shopping_days = sorted(
         [
@@ -222,18 +323,8 @@ def _build_shopping_habits(
         reverse=True,
     )
 
-    # Disposable bag spending — detect carrier bags so the LLM can suggest
-    # bringing a reusable bag instead of searching for bag promotions.
-    BAG_KEYWORDS = {"draagtas", "tas", "zak", "bag", "sachet", "carrier bag"}
-    bag_txns = [
-        t for t in transactions
-        if t.normalized_name
-        and any(kw in t.normalized_name.lower() for kw in BAG_KEYWORDS)
-    ]
     bag_spending = None
-    if bag_txns:
-        bag_total = sum(t.item_price for t in bag_txns)
-        bag_count = len(bag_txns)
+    if bag_count:
         bag_spending = {
             "total_spent": round(bag_total, 2),
             "times_purchased": bag_count,
@@ -242,47 +333,35 @@ def _build_shopping_habits(
         }
 
     # ── Aggregation 1: savings_summary ──
-    discount_txns = [t for t in transactions if t.is_discount]
     savings_summary = None
-    if discount_txns:
-        total_saved = abs(sum(t.item_price for t in discount_txns))
+    if has_discounts:
+        total_saved = abs(total_saved)
         total_spend_gross = total_spend + total_saved
         savings_rate_pct = round(total_saved / total_spend_gross * 100, 1) if total_spend_gross > 0 else 0
 
         # Per-store savings
-        store_savings: dict[str, float] = defaultdict(float)
-        store_net: dict[str, float] = defaultdict(float)
-        for t in transactions:
-            if t.is_discount:
-                store_savings[t.store_name] += abs(t.item_price)
-            store_net[t.store_name] += t.item_price
-
         per_store_savings = []
         for s_name in store_savings:
             s_saved = store_savings[s_name]
-            s_gross = store_net[s_name] + s_saved
+            s_gross = store_data[s_name]["spend"] + s_saved
             per_store_savings.append({
                 "store": s_name,
                 "saved": round(s_saved, 2),
                 "rate_pct": round(s_saved / s_gross * 100, 1) if s_gross > 0 else 0,
             })
-        per_store_savings.sort(key=lambda x: x["saved"], reverse=True)
+        per_store_savings = heapq.nlargest(10, per_store_savings, key=lambda x: x["saved"])
 
         savings_summary = {
             "total_saved": round(total_saved, 2),
             "savings_rate_pct": savings_rate_pct,
             "monthly_savings_avg": round(total_saved / weeks_in_period * 4.33, 2),
-            "per_store": per_store_savings[:10],
+            "per_store": per_store_savings,
         }
 
     # ── Aggregation 2: health_trend ──
-    today = date.today()
-    recent_28d = [t for t in transactions if t.health_score is not None and (today - t.date).days <= 28]
-    prev_28d = [t for t in transactions if t.health_score is not None and 29 <= (today - t.date).days <= 56]
-
     health_trend = None
-    current_4w_avg = sum(t.health_score for t in recent_28d) / len(recent_28d) if recent_28d else None
-    prev_4w_avg = sum(t.health_score for t in prev_28d) / len(prev_28d) if prev_28d else None
+    current_4w_avg = recent_health_sum / recent_health_count if recent_health_count else None
+    prev_4w_avg = prev_health_sum / prev_health_count if prev_health_count else None
 
     trend_direction = None
     if current_4w_avg is not None and prev_4w_avg is not None:
@@ -295,10 +374,6 @@ def _build_shopping_habits(
             trend_direction = "stable"
 
     # Healthiest/least healthy store (min 5 scored items)
-    store_health: dict[str, list[int]] = defaultdict(list)
-    for t in transactions:
-        if t.health_score is not None:
-            store_health[t.store_name].append(t.health_score)
     qualified_stores = {s: scores for s, scores in store_health.items() if len(scores) >= 5}
     healthiest_store = None
     least_healthy_store = None
@@ -307,18 +382,6 @@ def _build_shopping_habits(
         healthiest_store = max(store_avgs, key=store_avgs.get)  # type: ignore[arg-type]
         least_healthy_store = min(store_avgs, key=store_avgs.get)  # type: ignore[arg-type]
 
-    # Fresh produce & ready meals % of food spend
-    FOOD_CATEGORIES = {
-        "Meat & Fish", "Fresh Produce", "Dairy & Eggs",
-        "Ready Meals", "Bakery", "Pantry", "Frozen",
-        "Snacks & Sweets", "Drinks (Soft/Soda)", "Drinks (Water)",
-        "Alcohol", "Baby & Kids",
-    }
-    food_txns = [t for t in transactions if t.category in FOOD_CATEGORIES and not t.is_discount and not t.is_deposit]
-    total_food_spend = sum(t.item_price for t in food_txns)
-    fresh_produce_spend = sum(t.item_price for t in food_txns if t.category == "Fresh Produce")
-    ready_meals_spend = sum(t.item_price for t in food_txns if t.category == "Ready Meals")
-
     health_trend = {
         "current_4w_avg": round(current_4w_avg, 2) if current_4w_avg is not None else None,
         "previous_4w_avg": round(prev_4w_avg, 2) if prev_4w_avg is not None else None,
@@ -330,11 +393,6 @@ def _build_shopping_habits(
     }
 
     # ── Aggregation 3: shopping_efficiency ──
-    receipt_groups: dict[str, list[Transaction]] = defaultdict(list)
-    for t in transactions:
-        if t.receipt_id:
-            receipt_groups[t.receipt_id].append(t)
-
     shopping_efficiency = None
     if receipt_groups:
         small_trips = []
@@ -374,10 +432,6 @@ def _build_shopping_habits(
         }
 
     # ── Aggregation 4: brand_savings_potential ──
-    real_txns = [t for t in transactions if not t.is_discount and not t.is_deposit]
-    premium_spend = sum(t.item_price for t in real_txns if t.is_premium)
-    house_brand_spend = sum(t.item_price for t in real_txns if not t.is_premium and t.normalized_brand)
-    unbranded_spend = sum(t.item_price for t in real_txns if not t.normalized_brand)
     estimated_savings_full_switch = round(premium_spend * 0.25 / weeks_in_period * 4.33, 2) if premium_spend > 0 else 0
 
     brand_savings_potential = {
@@ -388,10 +442,6 @@ def _build_shopping_habits(
     }
 
     # ── Aggregation 5: indulgence_tracker ──
-    total_real_spend = sum(t.item_price for t in real_txns)
-    alcohol_spend = sum(t.item_price for t in real_txns if t.category == "Alcohol")
-    snacks_sweets_spend = sum(t.item_price for t in real_txns if t.category == "Snacks & Sweets")
-    tobacco_spend = sum(t.item_price for t in real_txns if t.category == "Tobacco")
     total_indulgence = alcohol_spend + snacks_sweets_spend + tobacco_spend
 
     indulgence_tracker = {
@@ -414,16 +464,15 @@ def _build_shopping_habits(
             concentration_score = 0
 
         # Category-store map (top 5 categories by spend)
-        cat_store_spend: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
-        for t in transactions:
-            if not t.is_discount and not t.is_deposit and t.category:
-                cat_store_spend[t.category][t.store_name] += t.item_price
-        cat_totals = {cat: sum(stores.values()) for cat, stores in cat_store_spend.items()}
-        top_5_cats = sorted(cat_totals, key=cat_totals.get, reverse=True)[:5]  # type: ignore[arg-type]
-        category_store_map = {}
-        for cat in top_5_cats:
-            stores_for_cat = cat_store_spend[cat]
-            category_store_map[cat] = max(stores_for_cat, key=stores_for_cat.get)  # type: ignore[arg-type]
+        cat_totals: dict[str, float] = defaultdict(float)
+        top_store_by_cat: dict[str, tuple[str, float]] = {}
+        for (cat, store_name), spend in cat_store_spend.items():
+            cat_totals[cat] += spend
+            best = top_store_by_cat.get(cat)
+            if best is None or spend > best[1]:
+                top_store_by_cat[cat] = (store_name, spend)
+        top_5_cats = heapq.nlargest(5, cat_totals, key=cat_totals.get)  # type: ignore[arg-type]
+        category_store_map = {cat: top_store_by_cat[cat][0] for cat in top_5_cats}
 
         store_loyalty = {
             "concentration_score": round(concentration_score, 3),
@@ -493,7 +542,7 @@ def _build_shopping_habits(
         "receipt_count": receipt_count,
         "avg_receipt_total": round(total_spend / receipt_count, 2) if receipt_count else 0,
         "shopping_frequency_per_week": round(receipt_count / weeks_in_period, 1),
-        "preferred_stores": preferred_stores[:10],
+        "preferred_stores": preferred_stores,
         "preferred_shopping_days": preferred_shopping_days,
         "category_breakdown": category_breakdown,
         "avg_health_score": avg_health,
@@ -652,7 +701,7 @@ def _build_promo_interest_items(
                 tags.append("increasing")
 
         # Day-of-week distribution — pick top 1-2 days (>= 25% of trips)
-        dow_counts = Counter(d.strftime("%A") for d in data["dates"])
+        dow_counts = Counter(_DAY_NAMES[d.weekday()] for d in data["dates"])
         total_dow = sum(dow_counts.values())
         preferred_days = [
             day
@@ -0,0 +1,17 @@
+"""
+Shared Google Gemini client.
+
+genai.Client owns the HTTP connection pools used for both the sync and the
+async (client.aio) APIs. Services are instantiated per request, so creating a
+client in each constructor threw those pools away after every call; instead
+every service gets the same client per API key for the lifetime of the process.
+"""
+from functools import lru_cache
+
+from google import genai
+
+
+@lru_cache()
+def get_gemini_client(api_key: str) -> genai.Client:
+    """Get the shared Gemini client for an API key."""
+    return genai.Client(api_key=api_key)
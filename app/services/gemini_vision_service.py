@@ -16,12 +16,12 @@ from dataclasses import dataclass
 from datetime import date
 from typing import Optional
 
-from google import genai
 from google.genai import types
 from PIL import Image
 
 from app.core.exceptions import GeminiAPIError
 from app.config import get_settings
+from app.services.gemini_client import get_gemini_client
 from app.services.categories import CATEGORIES_PROMPT_LIST, GRANULAR_CATEGORIES, get_parent_category
 
 settings = get_settings()
@@ -239,6 +239,9 @@ Return a JSON object with this structure:
   - "weight_or_volume": number or null
   - "price_per_unit_measure": number or null'''
 
+    # The category list is static, so format the prompt once per process
+    _SYSTEM_INSTRUCTION = SYSTEM_PROMPT.format(categories=CATEGORIES_PROMPT_LIST)
+
     # Image compression settings (for large images only)
     MAX_IMAGE_SIZE = (1600, 2400)  # Max dimensions for compressed image
     JPEG_QUALITY = 85  # JPEG compression quality
@@ -247,7 +250,13 @@ Return a JSON object with this structure:
         self.api_key = api_key or settings.GEMINI_API_KEY
         if not self.api_key:
             raise ValueError("Gemini API key not configured")
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = get_gemini_client(self.api_key)
+        self._config = types.GenerateContentConfig(
+            system_instruction=self._SYSTEM_INSTRUCTION,
+            max_output_tokens=self.MAX_TOKENS,
+            temperature=0.1,
+            response_mime_type="application/json",
+        )
 
     def _compress_image(self, image_content: bytes, mime_type: str) -> tuple[bytes, str]:
         """Compress image if it's too large.
@@ -294,9 +303,6 @@ Return a JSON object with this structure:
         Large images are also compressed.
         """
 
-        # Build prompt with shared category list
-        system_prompt = self.SYSTEM_PROMPT.format(categories=CATEGORIES_PROMPT_LIST)
-
         # Log input details for debugging
         logger.info(f"Gemini extraction: mime_type={mime_type}, content_size={len(file_content)} bytes")
 
@@ -309,7 +315,7 @@ Return a JSON object with this structure:
         extract_prompt = "Extract all line items from this receipt image. Return JSON only."
 
         try:
-            response = self.client.models.generate_content(
+            response = await self.client.aio.models.generate_content(
                 model=self.MODEL,
                 contents=[
                     types.Part.from_bytes(
@@ -318,12 +324,7 @@ Return a JSON object with this structure:
                     ),
                     extract_prompt,
                 ],
-                config=types.GenerateContentConfig(
-                    system_instruction=system_prompt,
-                    max_output_tokens=self.MAX_TOKENS,
-                    temperature=0.1,
-                    response_mime_type="application/json",
-                ),
+                config=self._config,
             )
 
             # Parse response - JSON mode guarantees valid JSON
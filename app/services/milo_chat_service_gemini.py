@@ -1,13 +1,12 @@
 from datetime import date, timedelta
 from typing import List, Optional, AsyncGenerator
-from collections import defaultdict
 
-from google import genai
 from google.genai import types
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
+from app.services.gemini_client import get_gemini_client
 from app.core.exceptions import GeminiAPIError
 from app.models.transaction import Transaction
 from app.models.user import User
@@ -22,6 +21,9 @@ class MiloChatServiceGemini:
 
     MODEL = "gemini-2.5-pro"
     MAX_TOKENS = 4096
+    # Stores listed individually in the data context; the long tail is summed
+    # into one line to keep the prompt size bounded for heavy users
+    MAX_CONTEXT_STORES = 10
 
     SYSTEM_PROMPT = """You are Milo, a joyful and hilariously witty AI shopping assistant who genuinely LOVES helping people understand their spending! You're like that one friend who's amazing with money but also cracks jokes at the grocery store. Part financial whiz, part stand-up comedian, part receipt detective.
 
@@ -101,97 +103,175 @@ You will receive the user's profile information (name, etc.) and their full tran
         self.api_key = api_key or settings.GEMINI_API_KEY
         if not self.api_key:
             raise ValueError("Gemini API key not configured")
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = get_gemini_client(self.api_key)
 
     async def _get_user_transaction_context(
         self,
         db: AsyncSession,
         user_id: str,
     ) -> str:
-        """Build a context string with the user's transactional data."""
+        """Build a context string with the user's transactional data.
+
+        Totals and breakdowns are aggregated in Postgres so only summary rows
+        and the most recent transactions are loaded, not the full year.
+        """
         today = date.today()
 
         # Get transactions from the last 12 months
         start_date = today - timedelta(days=365)
+        in_window = and_(
+            Transaction.user_id == user_id,
+            Transaction.date >= start_date,
+        )
 
-        result = await db.execute(
-            select(Transaction).where(
-                and_(
-                    Transaction.user_id == user_id,
-                    Transaction.date >= start_date,
-                )
-            ).order_by(Transaction.date.desc())
+        totals_result = await db.execute(
+            select(
+                func.sum(Transaction.item_price).label("total_spend"),
+                func.count(Transaction.id).label("transaction_count"),
+                func.min(Transaction.date).label("earliest_date"),
+                func.max(Transaction.date).label("latest_date"),
+            ).where(in_window)
         )
-        transactions = list(result.scalars().all())
+        totals = totals_result.one()
 
-        if not transactions:
+        if not totals.transaction_count:
             return "No transaction data available for this user."
 
-        # Build summary statistics
-        total_spend = sum(t.item_price for t in transactions)
-        transaction_count = len(transactions)
-
-        # Get date range
-        dates = [t.date for t in transactions]
-        earliest_date = min(dates)
-        latest_date = max(dates)
-
-        # Calculate category breakdown
-        category_totals = defaultdict(float)
-        category_counts = defaultdict(int)
-        for t in transactions:
-            category_totals[t.category] += t.item_price
-            category_counts[t.category] += 1
-
-        # Calculate store breakdown
-        store_totals = defaultdict(float)
-        store_visits = defaultdict(set)
-        for t in transactions:
-            store_totals[t.store_name] += t.item_price
-            store_visits[t.store_name].add(t.date)
-
-        # Calculate monthly spending
-        monthly_totals = defaultdict(float)
-        for t in transactions:
-            month_key = t.date.strftime("%Y-%m")
-            monthly_totals[month_key] += t.item_price
+        total_spend = totals.total_spend or 0.0
+
+        # Category breakdown
+        category_result = await db.execute(
+            select(
+                Transaction.category,
+                func.sum(Transaction.item_price).label("amount"),
+                func.count(Transaction.id).label("count"),
+            )
+            .where(in_window)
+            .group_by(Transaction.category)
+            .order_by(func.sum(Transaction.item_price).desc())
+        )
+
+        # Store breakdown (a visit is a distinct shopping day)
+        store_result = await db.execute(
+            select(
+                Transaction.store_name,
+                func.sum(Transaction.item_price).label("amount"),
+                func.count(func.distinct(Transaction.date)).label("visits"),
+            )
+            .where(in_window)
+            .group_by(Transaction.store_name)
+            .order_by(func.sum(Transaction.item_price).desc())
+        )
+
+        # Monthly spending
+        month_col = func.date_trunc("month", Transaction.date).label("month")
+        monthly_result = await db.execute(
+            select(
+                month_col,
+                func.sum(Transaction.item_price).label("amount"),
+            )
+            .where(in_window)
+            .group_by(month_col)
+            .order_by(month_col.desc())
+            .limit(12)
+        )
+
+        # Recent transaction details (last 100)
+        recent_result = await db.execute(
+            select(
+                Transaction.date,
+                Transaction.store_name,
+                Transaction.item_name,
+                Transaction.item_price,
+                Transaction.category,
+            )
+            .where(in_window)
+            .order_by(Transaction.date.desc())
+            .limit(100)
+        )
 
         # Build context string
         context_parts = [
             "=== USER'S TRANSACTION DATA ===",
-            f"\nData Range: {earliest_date} to {latest_date}",
-            f"Total Transactions: {transaction_count}",
+            f"\nData Range: {totals.earliest_date} to {totals.latest_date}",
+            f"Total Transactions: {totals.transaction_count}",
             f"Total Spending: €{total_spend:.2f}",
             f"\n--- SPENDING BY CATEGORY ---",
         ]
 
-        # Sort categories by spending
-        sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
-        for category, amount in sorted_categories:
-            count = category_counts[category]
-            pct = (amount / total_spend * 100) if total_spend > 0 else 0
-            context_parts.append(f"  {category}: €{amount:.2f} ({pct:.1f}%, {count} items)")
+        for row in category_result.all():
+            pct = (row.amount / total_spend * 100) if total_spend > 0 else 0
+            context_parts.append(f"  {row.category}: €{row.amount:.2f} ({pct:.1f}%, {row.count} items)")
 
         context_parts.append(f"\n--- SPENDING BY STORE ---")
-        sorted_stores = sorted(store_totals.items(), key=lambda x: x[1], reverse=True)
-        for store, amount in sorted_stores:
-            visits = len(store_visits[store])
-            pct = (amount / total_spend * 100) if total_spend > 0 else 0
-            context_parts.append(f"  {store}: €{amount:.2f} ({pct:.1f}%, {visits} visits)")
+        store_rows = store_result.all()
+        for row in store_rows[:self.MAX_CONTEXT_STORES]:
+            pct = (row.amount / total_spend * 100) if total_spend > 0 else 0
+            context_parts.append(f"  {row.store_name}: €{row.amount:.2f} ({pct:.1f}%, {row.visits} visits)")
+        other_stores = store_rows[self.MAX_CONTEXT_STORES:]
+        if other_stores:
+            other_amount = sum(row.amount for row in other_stores)
+            pct = (other_amount / total_spend * 100) if total_spend > 0 else 0
+            context_parts.append(
+                f"  Other stores ({len(other_stores)}): €{other_amount:.2f} ({pct:.1f}%, "
+                f"{sum(row.visits for row in other_stores)} visits)"
+            )
 
         context_parts.append(f"\n--- MONTHLY SPENDING ---")
-        for month in sorted(monthly_totals.keys(), reverse=True)[:12]:
-            context_parts.append(f"  {month}: €{monthly_totals[month]:.2f}")
+        for row in monthly_result.all():
+            context_parts.append(f"  {row.month.strftime('%Y-%m')}: €{row.amount:.2f}")
 
-        # Include recent transaction details (last 100)
         context_parts.append(f"\n--- RECENT TRANSACTIONS (Last 100) ---")
-        for t in transactions[:100]:
+        for t in recent_result.all():
             context_parts.append(
                 f"  [{t.date}] {t.store_name} | {t.item_name} | €{t.item_price:.2f} | {t.category}"
             )
 
         return "\n".join(context_parts)
 
+    async def _build_request(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        message: str,
+        conversation_history: Optional[List[ChatMessage]] = None,
+    ) -> tuple[List[types.Content], types.GenerateContentConfig]:
+        """Build the Gemini contents and config for a chat turn.
+
+        The user's data context goes into the system instruction, ahead of the
+        conversation, so the prompt prefix stays identical across turns and
+        Gemini's implicit prefix caching can reuse it. Only the history and the
+        new question vary between requests.
+        """
+        # Get user's profile and transaction context
+        profile = await self._get_user_profile(db, user_id)
+        profile_context = self._build_profile_context(profile)
+        transaction_context = await self._get_user_transaction_context(db, user_id)
+
+        context_parts = [self.SYSTEM_PROMPT]
+        if profile_context:
+            context_parts.append(profile_context)
+        context_parts.append(transaction_context)
+        system_instruction = "\n\n".join(context_parts)
+
+        # Build contents with conversation history
+        contents = []
+
+        # Add conversation history if provided
+        if conversation_history:
+            for msg in conversation_history:
+                role = "user" if msg.role == "user" else "model"
+                contents.append(types.Content(role=role, parts=[types.Part.from_text(text=msg.content)]))
+
+        contents.append(types.Content(role="user", parts=[types.Part.from_text(text=message)]))
+
+        config = types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            max_output_tokens=self.MAX_TOKENS,
+            temperature=0.7,
+        )
+        return contents, config
+
     async def chat(
         self,
         db: AsyncSession,
@@ -204,44 +284,15 @@ You will receive the user's profile information (name, etc.) and their full tran
 
         """
         try:
-            # Get user's profile and transaction context
-            profile = await self._get_user_profile(db, user_id)
-            profile_context = self._build_profile_context(profile)
-            transaction_context = await self._get_user_transaction_context(db, user_id)
-
-            # Build contents with conversation history
-            contents = []
-
-            # Add conversation history if provided
-            if conversation_history:
-                for msg in conversation_history:
-                    role = "user" if msg.role == "user" else "model"
-                    contents.append(types.Content(role=role, parts=[types.Part.from_text(text=msg.content)]))
-
-            # Build user message with context
-            context_parts = []
-            if profile_context:
-                context_parts.append(profile_context)
-            context_parts.append(transaction_context)
-            full_context = "\n\n".join(context_parts)
-
-            user_content = f"""Here is my data:
-
-{full_context}
-
-My question: {message}"""
-
-            contents.append(types.Content(role="user", parts=[types.Part.from_text(text=user_content)]))
+            contents, config = await self._build_request(
+                db, user_id, message, conversation_history
+            )
 
             # Call Gemini API
-            response = self.client.models.generate_content(
+            response = await self.client.aio.models.generate_content(
                 model=self.MODEL,
                 contents=contents,
-                config=types.GenerateContentConfig(
-                    system_instruction=self.SYSTEM_PROMPT,
-                    max_output_tokens=self.MAX_TOKENS,
-                    temperature=0.7,
-                ),
+                config=config,
             )
 
             return response.text
@@ -264,47 +315,18 @@ My question: {message}"""
         Yields text chunks as they are generated.
         """
         try:
-            # Get user's profile and transaction context
-            profile = await self._get_user_profile(db, user_id)
-            profile_context = self._build_profile_context(profile)
-            transaction_context = await self._get_user_transaction_context(db, user_id)
-
-            # Build contents with conversation history
-            contents = []
-
-            # Add conversation history if provided
-            if conversation_history:
-                for msg in conversation_history:
-                    role = "user" if msg.role == "user" else "model"
-                    contents.append(types.Content(role=role, parts=[types.Part.from_text(text=msg.content)]))
-
-            # Build user message with context
-            context_parts = []
-            if profile_context:
-                context_parts.append(profile_context)
-            context_parts.append(transaction_context)
-            full_context = "\n\n".join(context_parts)
-
-            user_content = f"""Here is my data:
-
-{full_context}
-
-My question: {message}"""
-
-            contents.append(types.Content(role="user", parts=[types.Part.from_text(text=user_content)]))
+            contents, config = await self._build_request(
+                db, user_id, message, conversation_history
+            )
 
             # Call Gemini API with streaming
-            response = self.client.models.generate_content_stream(
+            response = await self.client.aio.models.generate_content_stream(
                 model=self.MODEL,
                 contents=contents,
-                config=types.GenerateContentConfig(
-                    system_instruction=self.SYSTEM_PROMPT,
-                    max_output_tokens=self.MAX_TOKENS,
-                    temperature=0.7,
-                ),
+                config=config,
             )
 
-            for chunk in response:
+            async for chunk in response:
                 if chunk.text:
                     yield chunk.text
 
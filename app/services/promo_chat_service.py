@@ -7,15 +7,19 @@ Handles promo search chat interactions:
 3. Returns structured promo results with a friendly response
 """
 
+import asyncio
+import heapq
 import json
 import logging
 import os
 from datetime import date, datetime
+from functools import lru_cache
 from typing import Optional
 
 from pinecone import Pinecone
 
 from app.config import get_settings
+from app.core.cache import build_llm_cache_key, cached_llm_call
 from app.schemas.promo_chat import (
     PromoChatMessage,
     PromoChatResponse,
@@ -36,12 +40,16 @@ SEARCH_TOP_K = 30
 RERANK_TOP_N = 10
 RERANK_SCORE_THRESHOLD = 0.40  # Threshold for non-filtered searches
 
+# Intent extraction is near-deterministic (temperature 0.1), so repeated
+# queries can reuse the previous extraction
+INTENT_CACHE_TTL_SECONDS = 24 * 3600
+
 # Belgian supermarket chains for retailer matching
-BELGIAN_RETAILERS = [
+BELGIAN_RETAILERS = (
     "colruyt", "delhaize", "carrefour", "aldi", "lidl", "spar",
     "albert heijn", "bio-planet", "okay", "jumbo", "intermarché",
-    "cora", "match", "louis delhaize", "proxy delhaize"
-]
+    "cora", "match", "louis delhaize", "proxy delhaize",
+)
 
 # LLM prompt for intent extraction - uses CATEGORIES_PROMPT_LIST dynamically
 INTENT_EXTRACTION_PROMPT = f"""You are a promo search assistant for Belgian supermarkets. Your job is to extract structured search parameters from user queries about grocery promotions.
@@ -116,6 +124,19 @@ Respond with ONLY a JSON object in this exact format:
 }}"""
 
 
+@lru_cache(maxsize=8)
+def _intent_config(system_prompt: str):
+    """Build the Gemini intent-extraction config once per system prompt."""
+    from google.genai import types
+
+    return types.GenerateContentConfig(
+        system_instruction=system_prompt,
+        max_output_tokens=500,
+        temperature=0.1,  # Low temperature for consistent structured output
+        response_mime_type="application/json",
+    )
+
+
 class PromoChatService:
     """Service for handling promo search chat interactions."""
 
@@ -184,9 +205,13 @@ class PromoChatService:
         user_prompt = f"{context}User message: {message}\n\nExtract search parameters:"
 
         try:
-            response_text = await self._call_llm(
-                system_prompt=INTENT_EXTRACTION_PROMPT,
-                user_message=user_prompt,
+            response_text = await cached_llm_call(
+                build_llm_cache_key("intent", INTENT_EXTRACTION_PROMPT, user_prompt),
+                INTENT_CACHE_TTL_SECONDS,
+                lambda: self._call_llm(
+                    system_prompt=INTENT_EXTRACTION_PROMPT,
+                    user_message=user_prompt,
+                ),
             )
 
             # Parse JSON response
@@ -198,8 +223,9 @@ class PromoChatService:
                     clean_response = clean_response[4:]
             clean_response = clean_response.strip()
 
-            parsed = json.loads(clean_response)
-            return SearchQuery(**parsed)
+            # Decode and validate in one step (pydantic-core) instead of
+            # json.loads into a dict followed by SearchQuery(**parsed)
+            return SearchQuery.model_validate_json(clean_response)
 
         except (json.JSONDecodeError, Exception) as e:
             logger.warning(f"Failed to parse LLM intent response: {e}")
@@ -220,26 +246,21 @@ class PromoChatService:
         anthropic_api_key = os.environ.get("ANTHROPIC_API_KEY", "")
 
         if gemini_api_key:
-            from google import genai
-            from google.genai import types
+            from app.services.gemini_client import get_gemini_client
 
-            client = genai.Client(api_key=gemini_api_key)
-            response = client.models.generate_content(
+            client = get_gemini_client(gemini_api_key)
+            response = await client.aio.models.generate_content(
                 model="gemini-2.0-flash",  # Fast model for intent extraction
                 contents=[user_message],
-                config=types.GenerateContentConfig(
-                    system_instruction=system_prompt,
-                    max_output_tokens=500,
-                    temperature=0.1,  # Low temperature for consistent structured output
-                ),
+                config=_intent_config(system_prompt),
             )
             return response.text
 
         elif anthropic_api_key:
             import anthropic
 
-            client = anthropic.Anthropic(api_key=anthropic_api_key)
-            response = client.messages.create(
+            client = anthropic.AsyncAnthropic(api_key=anthropic_api_key)
+            response = await client.messages.create(
                 model="claude-3-5-haiku-20241022",  # Fast model for intent extraction
                 max_tokens=500,
                 system=system_prompt,
@@ -250,12 +271,13 @@ class PromoChatService:
         else:
             # Fallback: simple keyword extraction without LLM
             logger.warning("No LLM API key available, using fallback extraction")
+            message_lower = user_message.lower()
             return json.dumps({
                 "search_text": user_message,
                 "product_keywords": user_message.split(),
                 "brands": [],
                 "categories": [],
-                "retailers": [r for r in BELGIAN_RETAILERS if r in user_message.lower()],
+                "retailers": [r for r in BELGIAN_RETAILERS if r in message_lower],
                 "is_vague": len(user_message.split()) < 2,
                 "clarification_needed": None,
             })
@@ -307,7 +329,9 @@ class PromoChatService:
                 combined_filter = {"$and": [base_filter, category_filter]}
 
                 # Search with category filter
-                hits = self._pinecone_search_and_rerank(search_query.search_text, combined_filter)
+                hits = await asyncio.to_thread(
+                    self._pinecone_search_and_rerank, search_query.search_text, combined_filter
+                )
 
                 for hit in hits:
                     hit_id = hit.get("_id", "")
@@ -329,7 +353,9 @@ class PromoChatService:
 
         # Also run a search without category filter as fallback
         logger.info(f"[promo_chat] Running fallback search without category filter")
-        hits = self._pinecone_search_and_rerank(search_query.search_text, base_filter)
+        hits = await asyncio.to_thread(
+            self._pinecone_search_and_rerank, search_query.search_text, base_filter
+        )
 
         for hit in hits:
             hit_id = hit.get("_id", "")
@@ -348,8 +374,7 @@ class PromoChatService:
                     all_promos.append(promo)
 
         # Sort by relevance and limit results
-        all_promos.sort(key=lambda p: p.relevance_score, reverse=True)
-        return all_promos[:RERANK_TOP_N]
+        return heapq.nlargest(RERANK_TOP_N, all_promos, key=lambda p: p.relevance_score)
 
     def _pinecone_search_and_rerank(self, query_text: str, filter_dict: Optional[dict]) -> list[dict]:
         """Execute integrated search + rerank in a single Pinecone API call."""
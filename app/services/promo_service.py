@@ -8,14 +8,17 @@ recommendations via Gemini.
 import asyncio
 import json
 import logging
+import re
 import time
 from datetime import date, timedelta
+from functools import lru_cache
 from typing import Any, Optional
 
 from pinecone import Pinecone
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
+from app.core.cache import build_llm_cache_key, cached_llm_call
 from app.db.repositories.enriched_profile_repo import EnrichedProfileRepository
 
 logger = logging.getLogger(__name__)
@@ -25,6 +28,14 @@ SEARCH_TOP_K = 20
 RERANK_TOP_N = 5
 RERANK_SCORE_THRESHOLD = 0.55
 
+# Gemini recommendation generation
+GEMINI_MODEL = "gemini-3-pro-preview"
+LLM_CACHE_TTL_SECONDS = 6 * 3600  # Same profile + same promos -> same recommendations
+
+# JSON cleanup patterns used when the model output isn't valid as-is
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+_TRAILING_COMMA_AT_END_RE = re.compile(r',\s*$')
+
 SYSTEM_PROMPT = """\
 You are the user's personal promo hunter inside a Belgian grocery savings app called Scandelicious.
 Your job is to analyze matched promotions against the user's shopping habits and return a structured JSON response.
@@ -240,44 +251,49 @@ class PromoService:
     ) -> dict:
         """Send profile + matched promos to Gemini for recommendation generation."""
         user_message = _build_llm_context(profile, promo_results)
-        raw_response = await asyncio.to_thread(
-            self._call_gemini, user_message
+        raw_response = await cached_llm_call(
+            build_llm_cache_key(GEMINI_MODEL, SYSTEM_PROMPT, user_message),
+            LLM_CACHE_TTL_SECONDS,
+            lambda: self._call_gemini(user_message),
+            cacheable=_is_complete_json,
         )
         return _parse_llm_response(raw_response)
 
-    def _call_gemini(self, user_message: str, attempt: int = 1) -> str:
-        from google import genai
-        from google.genai import types
-        from app.schemas.promo import GeminiPromoOutput
+    async def _call_gemini(self, user_message: str, attempt: int = 1) -> str:
+        """Stream the recommendation JSON from Gemini and return the full text.
+
+        Streaming keeps the (up to 16k token) generation on the event loop
+        instead of blocking a worker thread for the whole response.
+        """
+        from app.services.gemini_client import get_gemini_client
 
-        client = genai.Client(api_key=self.settings.GEMINI_API_KEY)
-        response = client.models.generate_content(
-            model="gemini-3-pro-preview",
+        client = get_gemini_client(self.settings.GEMINI_API_KEY)
+        chunks = []
+        last_chunk = None
+        async for chunk in await client.aio.models.generate_content_stream(
+            model=GEMINI_MODEL,
             contents=[user_message],
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
-                max_output_tokens=16384,
-                temperature=0.7,
-                response_mime_type="application/json",
-                response_schema=GeminiPromoOutput,
-            ),
-        )
-        if response.text is None:
-            logger.warning(f"Gemini returned None text. Candidates: {response.candidates}")
+            config=_gemini_config(),
+        ):
+            last_chunk = chunk
+            if chunk.text:
+                chunks.append(chunk.text)
+
+        if not chunks:
+            logger.warning(f"Gemini returned None text. Candidates: {getattr(last_chunk, 'candidates', None)}")
             raise GeminiPromoError("Gemini returned empty response — likely blocked by safety filters")
+        text = "".join(chunks)
 
         # Verify JSON is parseable; retry once if truncated
-        raw = response.text.strip()
-        try:
-            json.loads(raw)
-        except json.JSONDecodeError:
+        if not _is_complete_json(text):
             if attempt < 2:
                 logger.warning(f"Gemini returned truncated JSON (attempt {attempt}), retrying...")
-                time.sleep(1)
-                return self._call_gemini(user_message, attempt + 1)
+                await asyncio.sleep(1)
+                return await self._call_gemini(user_message, attempt + 1)
+            # Returned for _parse_llm_response to repair, but not cached
             logger.warning(f"Gemini returned truncated JSON on final attempt")
 
-        return response.text
+        return text
 
     @staticmethod
     def _empty_response() -> dict:
@@ -300,6 +316,21 @@ class PromoService:
         }
 
 
+@lru_cache()
+def _gemini_config():
+    """Build the recommendation GenerateContentConfig once per process."""
+    from google.genai import types
+    from app.schemas.promo import GeminiPromoOutput
+
+    return types.GenerateContentConfig(
+        system_instruction=SYSTEM_PROMPT,
+        max_output_tokens=16384,
+        temperature=0.7,
+        response_mime_type="application/json",
+        response_schema=GeminiPromoOutput,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Exceptions
 # ---------------------------------------------------------------------------
@@ -674,10 +705,18 @@ def _build_llm_context(profile: dict, promo_results: dict[str, list[dict]]) -> s
     return "\n".join(parts)
 
 
+def _is_complete_json(raw: str) -> bool:
+    """Check that the model output parses as JSON without any repair."""
+    try:
+        json.loads(raw.strip())
+    except json.JSONDecodeError:
+        return False
+    return True
+
+
 def _repair_truncated_json(raw: str) -> str | None:
     """Attempt to repair truncated JSON by closing open brackets/braces."""
     # Strip any trailing incomplete string (unterminated "...")
-    import re
     s = raw.rstrip()
 
     # Remove trailing incomplete key-value or string
@@ -688,7 +727,7 @@ def _repair_truncated_json(raw: str) -> str | None:
         s += '"'
 
     # Remove trailing comma if present
-    s = re.sub(r',\s*$', '', s)
+    s = _TRAILING_COMMA_AT_END_RE.sub('', s)
 
     # Count open vs close brackets
     stack = []
@@ -734,7 +773,6 @@ def _parse_llm_response(raw_response: str) -> dict:
     GeminiPromoOutput. We still apply fixups for page_number (int coercion)
     and discount_percentage (server-side recalculation for accuracy).
     """
-    import re
     from pydantic import ValidationError
     from app.schemas.promo import GeminiPromoOutput
 
@@ -745,31 +783,38 @@ def _parse_llm_response(raw_response: str) -> dict:
             clean = clean[4:]
         clean = clean.strip()
 
-    # Safety net: strip trailing commas
-    clean = re.sub(r',\s*([}\]])', r'\1', clean)
-
-    # Parse and validate through Pydantic schema
+    # Fast path: schema-constrained output is normally valid as-is
     try:
-        validated = GeminiPromoOutput.model_validate_json(clean)
-        data = validated.model_dump()
-    except (ValidationError, ValueError) as e:
-        logger.warning(f"Pydantic validation failed, falling back to loose parse: {e}")
+        data = GeminiPromoOutput.model_validate_json(clean).model_dump()
+    except (ValidationError, ValueError):
+        data = None
+
+    if data is None:
+        # Safety net: strip trailing commas
+        clean = _TRAILING_COMMA_RE.sub(r'\1', clean)
+
+        # Parse and validate through Pydantic schema
         try:
-            data = json.loads(clean, strict=False)
-        except json.JSONDecodeError as e2:
-            logger.warning(f"JSON parse failed: {e2}, attempting truncation repair...")
-            repaired = _repair_truncated_json(clean)
-            if repaired:
-                try:
-                    data = json.loads(repaired, strict=False)
-                    logger.info("Truncated JSON repaired successfully")
-                except json.JSONDecodeError as e3:
-                    logger.error(f"Failed to parse even repaired JSON: {e3}")
-                    logger.error(f"Raw response (first 500 chars): {raw_response[:500]}")
+            validated = GeminiPromoOutput.model_validate_json(clean)
+            data = validated.model_dump()
+        except (ValidationError, ValueError) as e:
+            logger.warning(f"Pydantic validation failed, falling back to loose parse: {e}")
+            try:
+                data = json.loads(clean, strict=False)
+            except json.JSONDecodeError as e2:
+                logger.warning(f"JSON parse failed: {e2}, attempting truncation repair...")
+                repaired = _repair_truncated_json(clean)
+                if repaired:
+                    try:
+                        data = json.loads(repaired, strict=False)
+                        logger.info("Truncated JSON repaired successfully")
+                    except json.JSONDecodeError as e3:
+                        logger.error(f"Failed to parse even repaired JSON: {e3}")
+                        logger.error(f"Raw response (first 500 chars): {raw_response[:500]}")
+                        return _empty_fallback()
+                else:
+                    logger.error(f"JSON repair failed. Raw (first 500 chars): {raw_response[:500]}")
                     return _empty_fallback()
-            else:
-                logger.error(f"JSON repair failed. Raw (first 500 chars): {raw_response[:500]}")
-                return _empty_fallback()
 
     # Cap top_picks at 3
     data["top_picks"] = data.get("top_picks", [])[:3]
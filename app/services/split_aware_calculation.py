@@ -7,7 +7,7 @@ by accounting for expense splits where the user only pays their portion.
 from typing import Dict, List, Set, Optional
 from collections import defaultdict
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -15,6 +15,31 @@ from app.models.expense_split import ExpenseSplit, SplitParticipant, SplitAssign
 from app.models.transaction import Transaction
 
 
+def _user_share(item_price: float, participant_ids: List[str], me_id: str) -> float:
+    """User's share of a split item: an equal part if "Me" is assigned, else nothing."""
+    if me_id in participant_ids:
+        # User's share = item_price / number of participants
+        return round(item_price / len(participant_ids), 2)
+    # "Me" not assigned to this item - user pays nothing
+    return 0.0
+
+
+def _me_participants():
+    """Subquery with one "Me" participant (split_id, me_id) per split.
+
+    Joining every is_me row directly would emit a transaction once per such
+    participant; picking one keeps a single, deterministic share per item.
+    """
+    return (
+        select(
+            SplitParticipant.split_id,
+            func.min(SplitParticipant.id).label("me_id"),
+        )
+        .where(SplitParticipant.is_me == True)
+        .group_by(SplitParticipant.split_id)
+        .subquery()
+    )
+
 
 class SplitAwareCalculation:
     """
@@ -52,56 +77,109 @@ class SplitAwareCalculation:
         if not transaction_ids:
             return {}
 
-        # Get all split assignments for these transactions
-        # We need to join through ExpenseSplit to filter by user_id
+        # Get transaction amounts for all requested transactions
+        tx_result = await self.db.execute(
+            select(Transaction.id, Transaction.item_price)
+            .where(Transaction.id.in_(transaction_ids))
+        )
+        transactions = tx_result.all()
+
+        split_shares = await self._get_split_shares(user_id, transactions)
+
+        # No split - user pays full amount
+        return {t.id: split_shares.get(t.id, t.item_price) for t in transactions}
+
+    async def _get_split_shares(
+        self,
+        user_id: str,
+        transactions: List,
+    ) -> Dict[str, float]:
+        """
+        Get the user's share for the split transactions among transactions.
+
+        Only transactions that are part of one of the user's splits appear in
+        the result. Prices come from the rows the caller already loaded, so
+        only the split assignments are queried.
+
+        Args:
+            user_id: The user's ID
+            transactions: Transaction objects or rows with id and item_price
+
+        Returns:
+            Dict mapping transaction_id to user's share amount
+        """
+        if not transactions:
+            return {}
+
+        prices = {t.id: t.item_price for t in transactions}
+
+        # Get the split assignments for these transactions, with the "Me"
+        # participant; we need to join through ExpenseSplit to filter by user_id
+        me = _me_participants()
         result = await self.db.execute(
-            select(SplitAssignment, ExpenseSplit, SplitParticipant)
+            select(
+                SplitAssignment.transaction_id,
+                SplitAssignment.participant_ids,
+                me.c.me_id,
+            )
             .join(ExpenseSplit, SplitAssignment.split_id == ExpenseSplit.id)
-            .join(SplitParticipant, and_(
-                SplitParticipant.split_id == ExpenseSplit.id,
-                SplitParticipant.is_me == True
-            ))
+            .join(me, me.c.split_id == ExpenseSplit.id)
             .where(
                 ExpenseSplit.user_id == user_id,
-                SplitAssignment.transaction_id.in_(transaction_ids),
+                SplitAssignment.transaction_id.in_(list(prices)),
             )
         )
-        rows = result.all()
-
-        # Build a map of transaction_id -> (assignment, me_participant_id)
-        transaction_splits: Dict[str, tuple] = {}
-        for assignment, split, me_participant in rows:
-            transaction_splits[assignment.transaction_id] = (
-                assignment.participant_ids,
-                me_participant.id,
+
+        return {
+            row.transaction_id: _user_share(
+                prices[row.transaction_id], row.participant_ids, row.me_id
             )
+            for row in result.all()
+        }
 
-        # Get transaction amounts for all requested transactions
-        tx_result = await self.db.execute(
-            select(Transaction.id, Transaction.item_price)
-            .where(Transaction.id.in_(transaction_ids))
+    async def get_split_adjustments(
+        self,
+        user_id: str,
+        columns: tuple,
+        *criteria,
+    ) -> List[tuple]:
+        """
+        Get (row, adjustment) for split transactions matching criteria.
+
+        The adjustment is the user's share minus the full item_price, so adding
+        it to a plain SUM(item_price) over the same criteria and grouping gives
+        the split-adjusted total without loading every transaction.
+
+        Args:
+            user_id: The user's ID
+            columns: Transaction columns to return on each row (the grouping keys)
+            *criteria: Extra WHERE clauses on Transaction
+
+        Returns:
+            List of (row, adjustment) tuples
+        """
+        me = _me_participants()
+        result = await self.db.execute(
+            select(
+                *columns,
+                Transaction.id.label("split_tx_id"),
+                Transaction.item_price,
+                SplitAssignment.participant_ids,
+                me.c.me_id,
+            )
+            .join(SplitAssignment, SplitAssignment.transaction_id == Transaction.id)
+            .join(ExpenseSplit, SplitAssignment.split_id == ExpenseSplit.id)
+            .join(me, me.c.split_id == ExpenseSplit.id)
+            .where(ExpenseSplit.user_id == user_id, *criteria)
         )
-        tx_amounts = {row.id: row.item_price for row in tx_result.all()}
-
-        # Calculate user shares
-        shares: Dict[str, float] = {}
-        for tx_id, item_price in tx_amounts.items():
-            if tx_id in transaction_splits:
-                participant_ids, me_id = transaction_splits[tx_id]
-
-                # Check if "Me" is in this assignment
-                if me_id in participant_ids:
-                    # User's share = item_price / number of participants
-                    num_participants = len(participant_ids)
-                    shares[tx_id] = round(item_price / num_participants, 2)
-                else:
-                    # "Me" not assigned to this item - user pays nothing
-                    shares[tx_id] = 0.0
-            else:
-                # No split - user pays full amount
-                shares[tx_id] = item_price
-
-        return shares
+
+        # At most one adjustment per transaction, like the id-keyed share lookups
+        rows_by_tx = {row.split_tx_id: row for row in result.all()}
+
+        return [
+            (row, _user_share(row.item_price, row.participant_ids, row.me_id) - row.item_price)
+            for row in rows_by_tx.values()
+        ]
 
     async def calculate_split_adjusted_spend(
         self,
@@ -124,10 +202,9 @@ class SplitAwareCalculation:
         if not transactions:
             return 0.0
 
-        tx_ids = [t.id for t in transactions]
-        shares = await self.get_user_share_for_transactions(user_id, tx_ids)
+        shares = await self._get_split_shares(user_id, transactions)
 
-        return round(sum(shares.values()), 2)
+        return round(sum(shares.get(t.id, t.item_price) for t in transactions), 2)
 
     async def calculate_split_adjusted_spend_by_category(
         self,
@@ -147,8 +224,7 @@ class SplitAwareCalculation:
         if not transactions:
             return {}
 
-        tx_ids = [t.id for t in transactions]
-        shares = await self.get_user_share_for_transactions(user_id, tx_ids)
+        shares = await self._get_split_shares(user_id, transactions)
 
         # Group by category
         category_spend: Dict[str, float] = defaultdict(float)
@@ -177,8 +253,7 @@ class SplitAwareCalculation:
         if not transactions:
             return {}
 
-        tx_ids = [t.id for t in transactions]
-        shares = await self.get_user_share_for_transactions(user_id, tx_ids)
+        shares = await self._get_split_shares(user_id, transactions)
 
         # Group by store
         store_spend: Dict[str, float] = defaultdict(float)
@@ -209,7 +284,6 @@ class SplitAwareCalculation:
         if not transactions:
             return []
 
-        tx_ids = [t.id for t in transactions]
-        shares = await self.get_user_share_for_transactions(user_id, tx_ids)
+        shares = await self._get_split_shares(user_id, transactions)
 
         return [(t, shares.get(t.id, t.item_price)) for t in transactions]
@@ -0,0 +1,39 @@
+"""Add (user_id, date) composite indexes for receipts and transactions
+
+Revision ID: 018_add_user_date_indexes
+Revises: 017_fix_budget_id_defaults
+Create Date: 2026-10-18
+
+Nearly every analytics, budget and profile query filters on one user's rows
+within a date window. transactions declares ix_transactions_user_date on the
+model, but no migration creates it (the table predates Alembic), so it is
+created here if missing. receipts gets the equivalent (user_id, receipt_date)
+index used by the enriched profile rebuild and the date-sorted receipt listing.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "018_add_user_date_indexes"
+down_revision: Union[str, None] = "017_fix_budget_id_defaults"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_transactions_user_date "
+        "ON transactions (user_id, date)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_receipts_user_date "
+        "ON receipts (user_id, receipt_date)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_receipts_user_date")
+    # ix_transactions_user_date is declared on the model and predates this
+    # revision on databases created with create_all(), so it is left in place
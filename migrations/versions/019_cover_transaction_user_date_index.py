@@ -0,0 +1,44 @@
+"""Make the transactions (user_id, date) index cover category and item_price
+
+Revision ID: 019_cover_transaction_user_date_index
+Revises: 018_add_user_date_indexes
+Create Date: 2026-10-18
+
+The budget and analytics aggregates filter on one user's date range and sum
+item_price grouped by category. Carrying those two columns in the index lets
+Postgres answer them with an index-only scan instead of visiting the heap for
+every row. The covering index has the same key columns as
+ix_transactions_user_date, so it replaces it rather than sitting next to it.
+
+Both indexes are built and dropped CONCURRENTLY so the transactions table
+stays writable during the migration.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "019_cover_transaction_user_date_index"
+down_revision: Union[str, None] = "018_add_user_date_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_user_date_covering "
+            "ON transactions (user_id, date) INCLUDE (category, item_price)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_transactions_user_date")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_user_date "
+            "ON transactions (user_id, date)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_transactions_user_date_covering")
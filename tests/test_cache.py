@@ -0,0 +1,153 @@
+"""Tests for the per-user analytics cache."""
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core import cache
+
+USER_ID = "firebase-user-1"
+OTHER_USER_ID = "firebase-user-2"
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear_all()
+    yield
+    cache.clear_all()
+
+
+class _Service:
+    def __init__(self):
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    @cache.cached()
+    async def summary(self, user_id: str, month: int, year: int):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        return self.calls
+
+
+def test_result_is_cached():
+    service = _Service()
+    service.release.set()
+
+    async def main():
+        first = await service.summary(USER_ID, 1, 2024)
+        second = await service.summary(USER_ID, 1, 2024)
+        return first, second
+
+    assert asyncio.run(main()) == (1, 1)
+    assert service.calls == 1
+
+
+def test_result_computed_across_invalidation_is_not_stored():
+    service = _Service()
+
+    async def main():
+        task = asyncio.create_task(service.summary(USER_ID, 1, 2024))
+        await service.started.wait()
+        cache.invalidate_user(USER_ID)
+        service.release.set()
+        stale = await task
+        fresh = await service.summary(USER_ID, 1, 2024)
+        return stale, fresh
+
+    # The first result may predate the write, so the second call recomputes
+    assert asyncio.run(main()) == (1, 2)
+    assert service.calls == 2
+
+
+def test_invalidation_of_other_user_keeps_result():
+    service = _Service()
+
+    async def main():
+        task = asyncio.create_task(service.summary(USER_ID, 1, 2024))
+        await service.started.wait()
+        cache.invalidate_user(OTHER_USER_ID)
+        service.release.set()
+        await task
+        return await service.summary(USER_ID, 1, 2024)
+
+    assert asyncio.run(main()) == 1
+    assert service.calls == 1
+
+
+def test_invalidate_on_commit_drops_entries_refilled_before_commit():
+    service = _Service()
+    service.release.set()
+    engine = create_engine("sqlite://")
+
+    async def read():
+        return await service.summary(USER_ID, 1, 2024)
+
+    try:
+        with Session(engine) as session:
+            cache.invalidate_user_on_commit(session, USER_ID)
+            # A concurrent request reads the pre-commit data back into the cache
+            assert asyncio.run(read()) == 1
+            assert asyncio.run(read()) == 1
+            session.commit()
+    finally:
+        engine.dispose()
+
+    assert asyncio.run(read()) == 2
+
+
+def test_is_past_period():
+    today = date.today()
+    last_year = today.year - 1
+
+    assert cache._is_past_period(12, last_year)
+    assert cache._is_past_period(None, last_year)
+    assert not cache._is_past_period(today.month, today.year)
+    assert not cache._is_past_period(None, today.year)
+    assert cache._is_past_period(None, None, today - timedelta(days=1))
+    assert not cache._is_past_period(None, None, today)
+    assert not cache._is_past_period(None, None)
+
+
+def test_immutable_past_uses_past_period_tier():
+    class Service:
+        @cache.cached(immutable_past=True)
+        async def summary(self, user_id: str, month: int, year: int):
+            return month
+
+    today = date.today()
+    service = Service()
+    asyncio.run(service.summary(USER_ID, 12, today.year - 1))
+    asyncio.run(service.summary(USER_ID, today.month, today.year))
+
+    assert len(cache._past_period_cache) == 1
+    assert len(cache._cache) == 1
+
+    cache.invalidate_user(USER_ID)
+    assert len(cache._past_period_cache) == 0
+    assert len(cache._cache) == 0
+
+
+def test_key_exclude_shares_entry_across_excluded_args():
+    calls = 0
+
+    class Service:
+        @cache.cached(include_month=True, key_exclude=("today",))
+        async def bundle(self, user_id: str, today=None):
+            nonlocal calls
+            calls += 1
+            return calls
+
+    service = Service()
+
+    async def main():
+        return (
+            await service.bundle(USER_ID),
+            await service.bundle(USER_ID, date.today()),
+            await service.bundle(USER_ID, today=date.today()),
+        )
+
+    assert asyncio.run(main()) == (1, 1, 1)
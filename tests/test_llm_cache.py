@@ -0,0 +1,131 @@
+"""Tests for cached_llm_call request coalescing."""
+import asyncio
+
+import pytest
+
+from app.core import cache
+
+
+@pytest.fixture(autouse=True)
+def _clear_llm_cache():
+    cache.clear_all()
+    cache._llm_inflight.clear()
+    yield
+    cache.clear_all()
+    cache._llm_inflight.clear()
+
+
+def test_concurrent_misses_share_one_call():
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.cached_llm_call("k", 60, call) for _ in range(5))
+        )
+
+    assert asyncio.run(main()) == ["answer"] * 5
+    assert calls == 1
+    assert not cache._llm_inflight
+
+
+def test_result_is_cached_after_call():
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        return "answer"
+
+    async def main():
+        first = await cache.cached_llm_call("k", 60, call)
+        second = await cache.cached_llm_call("k", 60, call)
+        return first, second
+
+    assert asyncio.run(main()) == ("answer", "answer")
+    assert calls == 1
+
+
+def test_error_propagates_to_joiners_and_is_not_cached():
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.cached_llm_call("k", 60, failing) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert [type(r) for r in results] == [RuntimeError] * 3
+    assert calls == 1
+    assert not cache._llm_inflight
+
+    async def ok():
+        return "answer"
+
+    # The failure wasn't cached, so the next caller runs the call again
+    assert asyncio.run(cache.cached_llm_call("k", 60, ok)) == "answer"
+
+
+def test_leader_cancel_does_not_cancel_joiners():
+    calls = 0
+
+    async def main():
+        leader_started = asyncio.Event()
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            leader_started.set()
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        leader = asyncio.create_task(cache.cached_llm_call("k", 60, call))
+        await leader_started.wait()
+        joiners = [
+            asyncio.create_task(cache.cached_llm_call("k", 60, call)) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*joiners)
+
+    # The joiners retry instead of inheriting the leader's cancellation, and
+    # only one of them re-runs the call
+    assert asyncio.run(main()) == ["answer", "answer"]
+    assert calls == 2
+    assert not cache._llm_inflight
+
+
+def test_rejected_response_is_returned_but_not_cached():
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        return '{"truncated": ' if calls == 1 else '{"complete": true}'
+
+    def cacheable(text):
+        return text.endswith("}")
+
+    async def main():
+        first = await cache.cached_llm_call("k", 60, call, cacheable)
+        second = await cache.cached_llm_call("k", 60, call, cacheable)
+        third = await cache.cached_llm_call("k", 60, call, cacheable)
+        return first, second, third
+
+    assert asyncio.run(main()) == ('{"truncated": ', '{"complete": true}', '{"complete": true}')
+    assert calls == 2
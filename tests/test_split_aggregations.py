@@ -0,0 +1,258 @@
+"""Split-adjusted SQL aggregations must match the per-transaction Python folds."""
+import asyncio
+from datetime import date, datetime
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core import cache
+from app.db.base import Base
+from app.models.budget import Budget
+from app.models.expense_split import ExpenseSplit, SplitAssignment, SplitParticipant
+from app.models.receipt import Receipt
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.models.user_enriched_profile import UserEnrichedProfile  # noqa: F401 (User relationship)
+from app.services.analytics_service import AnalyticsService
+from app.services.budget_service import BudgetService
+from app.services.split_aware_calculation import SplitAwareCalculation
+
+USER_ID = "user-with-splits"
+OTHER_USER_ID = "user-without-splits"
+MONTH_START = date(2024, 3, 1)
+MONTH_END = date(2024, 3, 31)
+
+FRUITS = "Fruits"
+VEGETABLES = "Vegetables"
+DAIRY = "Dairy, Eggs & Cheese"
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear_all()
+    yield
+    cache.clear_all()
+
+
+def _seed(session):
+    session.add_all([
+        User(id=USER_ID, firebase_uid="uid-1"),
+        User(id=OTHER_USER_ID, firebase_uid="uid-2"),
+        Receipt(id="r1", user_id=USER_ID, store_name="Store A", receipt_date=date(2024, 3, 5)),
+        Receipt(id="r2", user_id=USER_ID, store_name="Store B", receipt_date=date(2024, 3, 12)),
+    ])
+
+    def tx(id, price, category, store, day, receipt_id=None, user_id=USER_ID):
+        return Transaction(
+            id=id,
+            user_id=user_id,
+            receipt_id=receipt_id,
+            store_name=store,
+            item_name=id,
+            item_price=price,
+            category=category,
+            health_score=3,
+            date=day,
+        )
+
+    session.add_all([
+        # Split with one "Me": t1 shared with a friend, t2 the friend's only
+        tx("t1", 10.00, FRUITS, "Store A", date(2024, 3, 5), "r1"),
+        tx("t2", 4.50, DAIRY, "Store A", date(2024, 3, 5), "r1"),
+        tx("t3", 3.33, FRUITS, "Store A", date(2024, 3, 5), "r1"),
+        # Split with two participants flagged as "Me"
+        tx("t4", 9.99, DAIRY, "Store B", date(2024, 3, 12), "r2"),
+        tx("t5", 7.00, VEGETABLES, "Store B", date(2024, 3, 12), "r2"),
+        # Not split, no receipt
+        tx("t6", 2.25, VEGETABLES, "Store C", date(2024, 3, 20)),
+        # Outside the month / another user's data
+        tx("t7", 100.00, FRUITS, "Store A", date(2024, 4, 1)),
+        tx("t8", 50.00, FRUITS, "Store A", date(2024, 3, 5), user_id=OTHER_USER_ID),
+    ])
+
+    session.add_all([
+        ExpenseSplit(id="s1", user_id=USER_ID, receipt_id="r1"),
+        SplitParticipant(id="p-me", split_id="s1", name="Me", color="#000000", is_me=True),
+        SplitParticipant(id="p-friend", split_id="s1", name="Friend", color="#FFFFFF"),
+        SplitAssignment(split_id="s1", transaction_id="t1", participant_ids=["p-me", "p-friend"]),
+        SplitAssignment(split_id="s1", transaction_id="t2", participant_ids=["p-friend"]),
+        ExpenseSplit(id="s2", user_id=USER_ID, receipt_id="r2"),
+        SplitParticipant(id="p-me-a", split_id="s2", name="Me", color="#000000", is_me=True),
+        SplitParticipant(id="p-me-b", split_id="s2", name="Me too", color="#000000", is_me=True),
+        SplitParticipant(id="p-friend-2", split_id="s2", name="Friend", color="#FFFFFF"),
+        SplitAssignment(
+            split_id="s2", transaction_id="t4", participant_ids=["p-me-a", "p-me-b", "p-friend-2"]
+        ),
+        SplitAssignment(split_id="s2", transaction_id="t5", participant_ids=["p-friend-2"]),
+    ])
+
+
+def _run(check):
+    """Run check(session) against a freshly seeded in-memory database."""
+
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(
+                    Base.metadata.create_all,
+                    tables=[
+                        Base.metadata.tables[name]
+                        for name in (
+                            "users",
+                            "receipts",
+                            "transactions",
+                            "expense_splits",
+                            "split_participants",
+                            "split_assignments",
+                        )
+                    ],
+                )
+            session_maker = async_sessionmaker(engine, expire_on_commit=False)
+            async with session_maker() as session:
+                _seed(session)
+                await session.commit()
+            async with session_maker() as session:
+                return await check(session)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+async def _python_folds(session):
+    """The previous per-transaction results: (total, by category, by store)."""
+    result = await session.execute(
+        select(Transaction).where(
+            Transaction.user_id == USER_ID,
+            Transaction.date >= MONTH_START,
+            Transaction.date <= MONTH_END,
+        )
+    )
+    transactions = list(result.scalars().all())
+    split_calc = SplitAwareCalculation(session)
+    return (
+        await split_calc.calculate_split_adjusted_spend(USER_ID, transactions),
+        await split_calc.calculate_split_adjusted_spend_by_category(USER_ID, transactions),
+        await split_calc.calculate_split_adjusted_spend_by_store(USER_ID, transactions),
+    )
+
+
+EXPECTED_BY_CATEGORY = {FRUITS: 8.33, DAIRY: 3.33, VEGETABLES: 2.25}
+EXPECTED_BY_STORE = {"Store A": 8.33, "Store B": 3.33, "Store C": 2.25}
+
+
+def test_python_folds_count_each_split_item_once():
+    total, by_category, by_store = _run(_python_folds)
+
+    assert total == 13.91
+    assert by_category == EXPECTED_BY_CATEGORY
+    assert by_store == EXPECTED_BY_STORE
+
+
+def test_split_adjustments_one_per_transaction():
+    async def check(session):
+        return await SplitAwareCalculation(session).get_split_adjustments(
+            USER_ID,
+            (Transaction.category,),
+            Transaction.user_id == USER_ID,
+            Transaction.date >= MONTH_START,
+            Transaction.date <= MONTH_END,
+        )
+
+    rows = _run(check)
+
+    adjustments = sorted((row.split_tx_id, round(adj, 2)) for row, adj in rows)
+    assert adjustments == [("t1", -5.0), ("t2", -4.5), ("t4", -6.66), ("t5", -7.0)]
+
+
+def test_budget_month_spend_matches_python_folds():
+    async def check(session):
+        sql = await BudgetService(session)._get_current_month_spend_bundle(
+            USER_ID, MONTH_END
+        )
+        return sql, await _python_folds(session)
+
+    (total, by_category), (py_total, py_by_category, _) = _run(check)
+
+    assert total == py_total
+    assert by_category == py_by_category
+
+
+def test_category_breakdown_matches_python_folds():
+    async def check(session):
+        sql = await AnalyticsService(session).get_category_breakdown(
+            USER_ID, MONTH_START, MONTH_END
+        )
+        return sql, await _python_folds(session)
+
+    breakdown, (py_total, py_by_category, _) = _run(check)
+
+    assert breakdown.total_spend == py_total
+    assert {c.name: c.spent for c in breakdown.categories} == py_by_category
+
+
+def test_pie_chart_summary_matches_python_folds():
+    async def check(session):
+        sql = await AnalyticsService(session).get_pie_chart_summary(USER_ID, 3, 2024)
+        return sql, await _python_folds(session)
+
+    summary, (py_total, py_by_category, py_by_store) = _run(check)
+
+    assert summary.total_spent == py_total
+    assert {c.name: c.total_spent for c in summary.categories} == py_by_category
+    assert {s.store_name: s.total_spent for s in summary.stores} == py_by_store
+
+
+def test_period_summary_matches_python_folds():
+    async def check(session):
+        sql = await AnalyticsService(session).get_period_summary(
+            USER_ID, MONTH_START, MONTH_END
+        )
+        return sql, await _python_folds(session)
+
+    summary, (py_total, _, py_by_store) = _run(check)
+
+    assert summary.total_spend == py_total
+    assert summary.transaction_count == 6
+    assert {s.store_name: s.amount_spent for s in summary.stores} == py_by_store
+
+
+def _budget(allocations):
+    return Budget(
+        id="b1",
+        user_id=USER_ID,
+        monthly_amount=500.0,
+        category_allocations=allocations,
+        is_smart_budget=False,
+        created_at=datetime(2024, 1, 1),
+        updated_at=datetime(2024, 1, 1),
+    )
+
+
+def test_budget_progress_validates_allocations():
+    async def check(session):
+        return await BudgetService(session).get_budget_progress(
+            USER_ID,
+            _budget([{"category": FRUITS, "amount": 50}, {"category": DAIRY, "amount": 20.5}]),
+        )
+
+    progress = _run(check)
+
+    assert [a.amount for a in progress.budget.category_allocations] == [50.0, 20.5]
+    assert {c.name: c.limit_amount for c in progress.category_progress} == {
+        FRUITS: 50.0,
+        DAIRY: 20.5,
+    }
+
+
+def test_budget_progress_rejects_non_positive_allocation():
+    async def check(session):
+        return await BudgetService(session).get_budget_progress(
+            USER_ID, _budget([{"category": FRUITS, "amount": 0}])
+        )
+
+    with pytest.raises(ValidationError, match="greater than 0"):
+        _run(check)